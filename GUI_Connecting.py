@@ -15,6 +15,8 @@ class GUIConnecting(QWidget):
         self.device_info = device_info
         self.color_palette = color_palette
         self.connected_count = 0
+        self.connected_addresses = set()  # boards can drop and reconnect
+        self.all_were_connected = False
         self.status_boxes = {}
         self.loading_texts = ["", ".", "..", "..."]
         self.current_loading_index = 0
@@ -89,8 +91,9 @@ class GUIConnecting(QWidget):
                 border: 1px solid {self.color_palette['dark_grey']};
             """
             )
-            self.connected_count += 1
+            self.connected_addresses.add(address)
         else:
+            self.connected_addresses.discard(address)
             label.setText(f"{self.device_info[address]}\n{address}\nFailed")
             label.setStyleSheet(
                 f"""
@@ -103,6 +106,8 @@ class GUIConnecting(QWidget):
             """
             )
 
-        # Check if all devices are connected
-        if self.connected_count == len(self.device_info):
+        # Check if all devices are connected (the first time only)
+        self.connected_count = len(self.connected_addresses)
+        if self.connected_count == len(self.device_info) and not self.all_were_connected:
+            self.all_were_connected = True
             QTimer.singleShot(1000, self.all_connected.emit)
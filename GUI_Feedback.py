@@ -2,6 +2,7 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
 from PyQt5.QtCore import Qt
 import numpy as np
 import random
+import instrumentation
 
 
 class GUIFeedbackBox(QWidget):
@@ -98,6 +99,7 @@ class GUIFeedbackBox(QWidget):
         layout.addWidget(self.label)
 
     # ---------------------- FEEDBACK -------------------------------------
+    @instrumentation.traced("gui.feedback.update")
     def update_feedback(self, cur_idx: int, pb_idx: int, _second_idx: int):
         jump = self.jumps[cur_idx]
 
@@ -25,6 +25,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap, QColor
+import instrumentation
 
 
 class GUIJump(QWidget):
@@ -218,6 +219,7 @@ class GUIJump(QWidget):
         )
         layout.addWidget(text, alignment=Qt.AlignCenter)
 
+    @instrumentation.traced("gui.jump.update_plot")
     def update_jump_plot(self, jump_idx):
         self.curr_jump_idx = jump_idx
         if not (0 <= jump_idx < len(self.jumps)):
@@ -10,15 +10,41 @@ from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtGui import QFont, QColor, QPixmap
 from time import time
+import numpy as np
+import instrumentation
+
+PLOT_WINDOW_S = 2.0  # seconds of history shown
+
+
+def decimate_min_max(x, y, n_bins):
+    """Peak-preserving decimation: keep the min and max sample of each bin.
+
+    Returns at most ``2 * n_bins`` points in time order, so spikes survive
+    even when there are more samples than pixels to draw them on."""
+    n = len(y)
+    if n_bins <= 0 or n <= 2 * n_bins:
+        return x, y
+    per_bin = n // n_bins
+    usable = per_bin * n_bins
+    bins = y[n - usable :].reshape(n_bins, per_bin)  # newest samples are kept
+    offset = n - usable + np.arange(n_bins) * per_bin
+    lo = offset + bins.argmin(axis=1)
+    hi = offset + bins.argmax(axis=1)
+    idx = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()
+    return x[idx], y[idx]
 
 
 class GUILivePlots(QWidget):
-    def __init__(self, color_palette, device_info, data):
+    def __init__(self, color_palette, device_info, data, decimate=True):
         super().__init__()
         self.color_palette = color_palette
         self.device_info = device_info
         self.data = data
+        self.decimate = decimate  # min/max decimate to the plot's pixel width
         self.plots = {}
+        self.curves = {}  # (address, sensor) -> [x, y, z] data items, made once
+        self.titles = {}  # (address, sensor) -> last title text set
+        self.last_totals = {}  # (address, sensor) -> buffer.total last drawn
         self.init_live_plots()
         self.setup_timer()
 
@@ -82,6 +108,8 @@ class GUILivePlots(QWidget):
             plots_layout.addWidget(gyro_plot, idx, 1)
 
             self.plots[address] = {"accel": accel_plot, "gyro": gyro_plot}
+            for sensor_type, plot in self.plots[address].items():
+                self.curves[(address, sensor_type)] = self.create_curves(plot)
 
     def add_legend_label(self, layout, text, color):
         label = QLabel(f"{text}:")
@@ -93,7 +121,7 @@ class GUILivePlots(QWidget):
     def create_plot_widget(self, title, y_min, y_max, unit):
         plot_item = pg.PlotWidget(title=title)
         plot_item.setYRange(y_min, y_max)
-        plot_item.setXRange(-2, 0)  # Display the last 2 seconds of data
+        plot_item.setXRange(-PLOT_WINDOW_S, 0)  # Display the last 2 seconds of data
         plot_item.getAxis("left").setLabel(unit)  # Set label for y-axis
         plot_item.getAxis("bottom").setLabel("Time (s)")  # Set label for x-axis
         plot_item.getPlotItem().getAxis("left").setStyle(
@@ -104,41 +132,61 @@ class GUILivePlots(QWidget):
         )
         return plot_item
 
+    def create_curves(self, plot):
+        """One persistent scatter item per axis, updated in place by setData."""
+        curves = []
+        for axis in "xyz":
+            curve = plot.plot(
+                [],
+                [],
+                pen=None,
+                symbol="o",
+                symbolSize=6,
+                symbolBrush=self.color_palette[f"plot_lines_{axis}"],
+            )
+            curves.append(curve)
+        return curves
+
     def setup_timer(self):
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_plots)
         self.timer.start(50)  # Update the plots every 50 milliseconds
 
+    @instrumentation.traced("gui.live_plots.update")
     def update_plots(self):
+        if not self.isVisible():
+            return
         current_time = time()
         for address, plots in self.plots.items():
-            if address in self.data:
-                for sensor_type in ["accel", "gyro"]:
-                    data = self.data[address][sensor_type]
-                    recent_data = data[data[:, 0] >= current_time - 2]
-                    time_data = recent_data[:, 0] - current_time
-                    if recent_data.size > 0:
-                        frequency = len(recent_data) / 2  # Hz calculation
-                        plots[sensor_type].clear()
-                        title_suffix = (
-                            f" ({frequency:.0f} Hz)"  # Frequency to be displayed
-                        )
-                        sensor_name = "Accel." if sensor_type == "accel" else "Gyro."
-                        for i in range(1, 4):  # X, Y, Z data columns
-                            plots[sensor_type].plot(
-                                time_data,
-                                recent_data[:, i],
-                                pen=None,
-                                symbol="o",
-                                symbolSize=6,
-                                symbolBrush=self.color_palette[
-                                    f"plot_lines_{chr(119+i)}"
-                                ],
-                            )
-                        # Update the plot title with the new frequency
-                        plots[sensor_type].setTitle(
-                            f"{self.device_info[address]} {sensor_name} {title_suffix}"
-                        )
+            if address not in self.data:
+                continue
+            for sensor_type in ["accel", "gyro"]:
+                key = (address, sensor_type)
+                buffer = self.data[address][sensor_type]
+                total = buffer.total
+                if total == self.last_totals.get(key):
+                    continue  # no new samples since the last frame
+                self.last_totals[key] = total
+
+                recent_data = buffer.last_seconds(PLOT_WINDOW_S, current_time)
+                if recent_data.size == 0:
+                    continue
+                time_data = recent_data[:, 0] - current_time
+                n_bins = plots[sensor_type].width() // 2 if self.decimate else 0
+                for i, curve in enumerate(self.curves[key], start=1):
+                    curve.setData(
+                        *decimate_min_max(time_data, recent_data[:, i], n_bins)
+                    )
+
+                # Update the plot title with the new frequency
+                frequency = len(recent_data) / PLOT_WINDOW_S  # Hz calculation
+                sensor_name = "Accel." if sensor_type == "accel" else "Gyro."
+                title = (
+                    f"{self.device_info[address]} {sensor_name}  ({frequency:.0f} Hz)"
+                )
+                if self.titles.get(key) != title:
+                    plots[sensor_type].setTitle(title)
+                    self.titles[key] = title
 
     def add_legend_icon(self, layout, label, color):
         pixmap = QPixmap(16, 16)
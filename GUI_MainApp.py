@@ -5,7 +5,6 @@ from PyQt5.QtWidgets import (
     QLabel,
     QWidget,
     QPushButton,
-    QScrollArea,
     QSpacerItem,
     QSizePolicy,
 )
@@ -51,6 +50,8 @@ class JumpAnalyzer(QWidget):
         metrics_widget,
         feedback_widget,
         panel_width,
+        leaderboard=None,
+        journal=None,
     ):
         super().__init__()
         self.color_palette = color_palette
@@ -85,14 +86,18 @@ class JumpAnalyzer(QWidget):
 
         right_panel = QVBoxLayout()
 
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setFixedSize((panel_width - 60), 170)
         self.selector_widget = GUISelector(
-            self.color_palette, self.jumps, jump_widget, metrics_widget, feedback_widget
+            self.color_palette,
+            self.jumps,
+            jump_widget,
+            metrics_widget,
+            feedback_widget,
+            leaderboard,
+            journal,
         )
-        scroll_area.setWidget(self.selector_widget)
-        right_panel.addWidget(scroll_area, stretch=1)
+        # The jump list scrolls (and virtualizes) itself
+        self.selector_widget.setFixedSize((panel_width - 60), 210)
+        right_panel.addWidget(self.selector_widget, stretch=1)
 
         right_panel.addWidget(metrics_widget, stretch=2)
         right_panel.addWidget(feedback_widget, stretch=1)
@@ -109,11 +114,13 @@ class JumpAnalyzer(QWidget):
 class MainApp(QWidget):
     dashboard_ready = pyqtSignal()
 
-    def __init__(self, device_info, data, jumps):
+    def __init__(self, device_info, data, jumps, leaderboard=None, journal=None):
         super().__init__()
         self.device_info = device_info
         self.data = data
         self.jumps = jumps
+        self.leaderboard = leaderboard
+        self.journal = journal
         self.color_palette = COLORS
         self.setWindowTitle("JumpCoach - Sara and Michael")
 
@@ -179,6 +186,8 @@ class MainApp(QWidget):
             self.metrics_widget,
             self.feedback_widget,
             panel_width,
+            self.leaderboard,
+            self.journal,
         )
 
         self.main_layout.addWidget(self.live_plots_widget, stretch=1)
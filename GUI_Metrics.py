@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
+import instrumentation
 
 
 class GUIMetrics(QWidget):
@@ -78,6 +79,7 @@ class GUIMetrics(QWidget):
             """
         )
 
+    @instrumentation.traced("gui.metrics.update_table")
     def update_metrics_table(self, jump_idx, *_):
         self.curr_jump_idx = jump_idx
         jump = self.jumps[jump_idx]
@@ -1,13 +1,145 @@
-from PyQt5.QtWidgets import QWidget, QHBoxLayout, QPushButton, QLabel, QVBoxLayout
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QMenu
+from PyQt5.QtWidgets import (
+    QWidget,
+    QHBoxLayout,
+    QPushButton,
+    QLabel,
+    QVBoxLayout,
+    QListView,
+    QAbstractItemView,
+    QComboBox,
+    QDoubleSpinBox,
+    QMenu,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractListModel,
+    QModelIndex,
+    QSize,
+    QSortFilterProxyModel,
+)
+from jump_detection import PersonalBestIndex, mark_stage
+import instrumentation
 
+# Metrics offered by the threshold filter (same order as the metrics table)
+FILTER_METRICS = [
+    "height",
+    "airtime",
+    "takeoff_knee_bend",
+    "landing_impact_jerk",
+    "landing_knee_bend",
+    "total_arm_movement",
+]
 
+
+# ---------------------- model ----------------------
+class JumpListModel(QAbstractListModel):
+    """One row per jump, read straight from the shared jumps list.
+
+    Rows hold no state of their own: labels are built on demand for the rows
+    the view paints, so memory does not grow with the session."""
+
+    JumpRole = Qt.UserRole + 1
+
+    def __init__(self, jumps, parent=None):
+        super().__init__(parent)
+        self.jumps = jumps  # Reference to the external jumps list
+        self.rows = 0  # rows announced to the views so far
+        self.pb_row = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.rows:
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            label_text = f"Jump {row + 1}"
+            if row == self.pb_row:
+                label_text += " (PB)"  # Add the PB label for the highest jump
+            return label_text
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == self.JumpRole:
+            return self.jumps[row]
+        return None
+
+    def sync(self):
+        """Announce jumps appended to (or dropped from the end of) the list."""
+        count = len(self.jumps)
+        if count > self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, count - 1)
+            self.rows = count
+            self.endInsertRows()
+        elif count < self.rows:
+            self.beginRemoveRows(QModelIndex(), count, self.rows - 1)
+            self.rows = count
+            self.endRemoveRows()
+
+    def remove_jump(self, row):
+        """Delete ``jumps[row]``; the rows after it are renumbered."""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.jumps[row]
+        self.rows -= 1
+        if self.pb_row is not None and self.pb_row >= row:
+            self.pb_row = None if self.pb_row == row else self.pb_row - 1
+        self.endRemoveRows()
+        if row < self.rows:
+            self.dataChanged.emit(self.index(row), self.index(self.rows - 1))
+
+    def set_pb_row(self, row):
+        """Move the "(PB)" label, repainting only the two rows involved."""
+        if row is not None and not 0 <= row < self.rows:
+            row = None
+        previous, self.pb_row = self.pb_row, row
+        for r in {previous, row} - {None}:
+            if r < self.rows:
+                self.dataChanged.emit(self.index(r), self.index(r))
+
+
+class JumpFilterProxy(QSortFilterProxyModel):
+    """Hides jumps whose metric is outside ``[minimum, maximum]``."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.metric = None
+        self.minimum = None
+        self.maximum = None
+
+    def set_threshold(self, metric=None, minimum=None, maximum=None):
+        """Filter on one metric; ``metric=None`` shows every jump."""
+        self.metric, self.minimum, self.maximum = metric, minimum, maximum
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.metric is None:
+            return True
+        jump = self.sourceModel().jumps[source_row]
+        value = (jump.metrics or {}).get(self.metric)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return False  # missing or placeholder metric
+        if self.minimum is not None and value < self.minimum:
+            return False
+        if self.maximum is not None and value > self.maximum:
+            return False
+        return True
+
+
+# ---------------------- widget ----------------------
 class GUISelector(QWidget):
     """A widget to handle the selection and display of jumps."""
 
     def __init__(
-        self, color_palette, jumps, jump_widget, metrics_widget, feedback_widget
+        self,
+        color_palette,
+        jumps,
+        jump_widget,
+        metrics_widget,
+        feedback_widget,
+        leaderboard=None,
+        journal=None,
     ):
         super().__init__()
         self.color_palette = color_palette
@@ -15,6 +147,10 @@ class GUISelector(QWidget):
         self.metrics_widget = metrics_widget
         self.feedback_widget = feedback_widget
         self.jumps = jumps  # Reference to the external jumps list
+        if leaderboard is None:
+            leaderboard = PersonalBestIndex.from_jumps(jumps)
+        self.leaderboard = leaderboard  # PB flags for any jump in O(log n)
+        self.journal = journal  # records deletions and feedback (jump_journal)
 
         # Main layout
         self.layout = QVBoxLayout(self)
@@ -27,146 +163,181 @@ class GUISelector(QWidget):
         self.title_label.setStyleSheet("font-size: 28px; font-family: 'Roboto';")
         self.layout.addWidget(self.title_label)
 
-        # Horizontal layout for jump buttons
-        self.buttons_layout = QHBoxLayout()
-        self.buttons_layout.setAlignment(Qt.AlignCenter)
-        self.layout.addLayout(self.buttons_layout)
+        # Virtualized jump list: only the visible rows are ever painted
+        self.model = JumpListModel(jumps, self)
+        self.proxy = JumpFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
+
+        self.list_view = QListView()
+        self.list_view.setModel(self.proxy)
+        self.list_view.setFlow(QListView.LeftToRight)
+        self.list_view.setWrapping(False)
+        self.list_view.setUniformItemSizes(True)  # O(1) layout per row
+        self.list_view.setGridSize(QSize(170, 64))
+        self.list_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.list_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.list_view.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self.show_context_menu)
+        self.list_view.clicked.connect(self.on_row_clicked)
+        self.list_view.setStyleSheet(self.list_style())
+        self.layout.addWidget(self.list_view)
+
+        # Navigation and metric filter
+        controls_layout = QHBoxLayout()
+        self.pb_button = self.add_control_button(controls_layout, "PB")
+        self.pb_button.clicked.connect(self.select_pb)
+        self.recent_button = self.add_control_button(controls_layout, "Latest")
+        self.recent_button.clicked.connect(self.select_recent)
+
+        self.filter_metric = QComboBox()
+        self.filter_metric.addItem("All jumps", None)
+        for name in FILTER_METRICS:
+            self.filter_metric.addItem(name.replace("_", " ").title(), name)
+        self.filter_direction = QComboBox()
+        self.filter_direction.addItems(["≥", "≤"])
+        self.filter_value = QDoubleSpinBox()
+        self.filter_value.setRange(-1e6, 1e6)
+        self.filter_value.setDecimals(2)
+        for widget in (self.filter_metric, self.filter_direction, self.filter_value):
+            widget.setStyleSheet("font-size: 16px; font-family: 'Roboto';")
+            controls_layout.addWidget(widget)
+        self.filter_metric.currentIndexChanged.connect(self.apply_filter)
+        self.filter_direction.currentIndexChanged.connect(self.apply_filter)
+        self.filter_value.valueChanged.connect(self.apply_filter)
+        self.layout.addLayout(controls_layout)
 
-        self.selected_button = None  # Keep track of the currently selected button
         self.highest_jump_button = None
         self.second_highest_jump_button = None
         self.update_ui(recent_jump_idx=0, highest_jump_idx=0, second_highest_jump_idx=0)
 
+    @instrumentation.traced("gui.selector.update_ui")
     def update_ui(self, recent_jump_idx, highest_jump_idx, second_highest_jump_idx):
-        """Update UI to reflect current jumps, adding or removing buttons as needed."""
+        """Sync the list with the jumps and show the newest jump.
+
+        Only new rows are announced to the view and only the old and new PB
+        rows are repainted; just the selected jump is rendered."""
         self.highest_jump_button = highest_jump_idx
         self.second_highest_jump_button = second_highest_jump_idx
-        self.clear_ui()
-        for i in range(1, len(self.jumps) + 1):
-            self.add_jump_button(i)
-            self.update_jump_view(i)
+        self.model.sync()
+        self.model.set_pb_row(highest_jump_idx)
+        self.select_recent()
+
+    # ---------------------- selection ----------------------
+    def select_row(self, row):
+        """Select and render jump ``row`` (0-based), clearing a filter hiding it."""
+        if not 0 <= row < self.model.rowCount():
+            return
+        index = self.proxy.mapFromSource(self.model.index(row))
+        if not index.isValid():  # filtered out
+            self.filter_metric.setCurrentIndex(0)
+            index = self.proxy.mapFromSource(self.model.index(row))
+        self.list_view.setCurrentIndex(index)
+        self.list_view.scrollTo(index)
+        self.update_jump_view(row + 1)
 
-    from PyQt5.QtWidgets import QMenu
+    def select_recent(self):
+        self.select_row(self.model.rowCount() - 1)
 
-    # Add this method to GUISelector
-    def add_context_menu(self, button, idx):
-        """Add a context menu to a button to allow jump deletion."""
+    def select_pb(self):
+        if self.highest_jump_button is not None:
+            self.select_row(self.highest_jump_button)
 
-        def show_context_menu(point):
-            menu = QMenu()
-            delete_action = menu.addAction("Delete Jump")
-            action = menu.exec_(button.mapToGlobal(point))
-            if action == delete_action:
-                self.delete_jump(idx)
+    def on_row_clicked(self, index):
+        """Handle a click on a row and render that jump."""
+        self.update_jump_view(self.proxy.mapToSource(index).row() + 1)
+
+    def apply_filter(self):
+        metric = self.filter_metric.currentData()
+        value = self.filter_value.value()
+        if self.filter_direction.currentIndex() == 0:
+            self.proxy.set_threshold(metric, minimum=value)
+        else:
+            self.proxy.set_threshold(metric, maximum=value)
 
-        button.setContextMenuPolicy(Qt.CustomContextMenu)
-        button.customContextMenuRequested.connect(show_context_menu)
+    # ---------------------- deletion ----------------------
+    def show_context_menu(self, point):
+        """Context menu on a row to allow jump deletion."""
+        index = self.list_view.indexAt(point)
+        if not index.isValid():
+            return
+        menu = QMenu()
+        delete_action = menu.addAction("Delete Jump")
+        action = menu.exec_(self.list_view.viewport().mapToGlobal(point))
+        if action == delete_action:
+            self.delete_jump(self.proxy.mapToSource(index).row() + 1)
 
     def delete_jump(self, idx):
         """Delete the jump at the given index and update the UI."""
-        # Remove the jump from the array
+        # Remove the jump from the array and the PB index
         if 0 <= idx - 1 < len(self.jumps):
-            del self.jumps[idx - 1]
-        # Update the UI
+            if self.journal is not None:
+                self.journal.remove(self.jumps[idx - 1])
+            self.model.remove_jump(idx - 1)
+            self.leaderboard.delete(idx - 1)
+        # Update the UI with the session-wide PB after the deletion
+        pb_idx, second_idx = (
+            self.leaderboard.query_rows(len(self.jumps) - 1) if self.jumps else (-1, -1)
+        )
         self.update_ui(
             recent_jump_idx=0,
-            highest_jump_idx=max(0, self.highest_jump_button - 1),
-            second_highest_jump_idx=max(0, self.second_highest_jump_button - 1),
-        )
-
-    # Update `add_jump_button` method to attach the context menu
-    def add_jump_button(self, idx):
-        """Add a button for each jump."""
-        # Determine if this is the highest jump
-        is_highest_jump = idx - 1 == self.highest_jump_button
-
-        # Create the button label
-        label_text = f"Jump {idx}"
-        if is_highest_jump:
-            label_text += " (PB)"  # Add the PB label for the highest jump
-
-        button = QPushButton(label_text)
-
-        # Add the new button to the layout
-        self.buttons_layout.addWidget(button)
-
-        # Set all buttons to not selected initially
-        for i in range(self.buttons_layout.count()):
-            existing_button = self.buttons_layout.itemAt(i).widget()
-            if existing_button:
-                self.set_button_style(existing_button, selected=False)
-
-        # Highlight the new button as the selected one
-        self.set_button_style(button, selected=True)
-        self.selected_button = button  # Update the selected button reference
-
-        # Add the context menu for deletion
-        self.add_context_menu(button, idx)
-
-        # Handle button click to update selection
-        button.clicked.connect(
-            lambda checked, idx=idx, btn=button: self.on_button_click(idx, btn)
+            highest_jump_idx=pb_idx,
+            second_highest_jump_idx=second_idx,
         )
 
-    def on_button_click(self, idx, button):
-        """Handle button click and update styles."""
-        # Deselect all buttons
-        for i in range(self.buttons_layout.count()):
-            existing_button = self.buttons_layout.itemAt(i).widget()
-            if existing_button:
-                self.set_button_style(existing_button, selected=False)
-
-        # Highlight the clicked button
-        self.set_button_style(button, selected=True)
-        self.selected_button = button  # Update the selected button reference
-        self.update_jump_view(idx)
-
-    def clear_ui(self):
-        """Clears the layout of all widgets."""
-        while self.buttons_layout.count():
-            child = self.buttons_layout.takeAt(0).widget()
-            if child:
-                child.hide()
-                child.deleteLater()
-
+    @instrumentation.traced("gui.selector.update_jump_view")
     def update_jump_view(self, jump_idx):
         """Update the jump plot and metrics when a jump is selected."""
         jump_idx -= 1
+        if jump_idx < len(self.leaderboard):
+            self.leaderboard.assign(self.jumps, jump_idx)  # flags may be stale
         self.jump_widget.update_jump_plot(jump_idx)
         feedback_metrics = self.feedback_widget.update_feedback(
             jump_idx, self.highest_jump_button, self.second_highest_jump_button
         )
+        detected_time = self.jumps[jump_idx].detected_time
+        mark_stage("feedback", detected_time)
         self.metrics_widget.update_metrics_table(
             jump_idx,
             self.highest_jump_button,
             self.second_highest_jump_button,
             feedback_metrics,
         )
+        mark_stage("display", detected_time)
+        if self.journal is not None:
+            self.journal.update_feedback(self.jumps[jump_idx])
 
-    def set_button_style(self, button, selected):
-        """Set button style based on selection state."""
-        base_style = """
-            font-size: 24px;
-            padding: 12px 24px;
+    # ---------------------- styling ----------------------
+    def add_control_button(self, layout, text):
+        button = QPushButton(text)
+        button.setStyleSheet(f"""
+            font-size: 16px;
+            padding: 6px 12px;
             border-radius: 10px;
-            border: 1px solid {border_color};
-            font-weight: normal;
-            background-color: {background_color};
-            color: {text_color};
+            border: 1px solid {self.color_palette['dark_grey']};
+            background-color: {self.color_palette['white']};
+            color: {self.color_palette['dark_grey']};
+            """)
+        layout.addWidget(button)
+        return button
+
+    def list_style(self):
+        """Rows look like the former jump buttons; the selected one is accented."""
+        return f"""
+            QListView {{
+                font-size: 24px;
+                border: none;
+                background-color: transparent;
+            }}
+            QListView::item {{
+                margin: 4px;
+                border-radius: 10px;
+                border: 1px solid {self.color_palette['dark_grey']};
+                background-color: {self.color_palette['white']};
+                color: {self.color_palette['dark_grey']};
+            }}
+            QListView::item:selected {{
+                background-color: {self.color_palette['accent_color']};
+                color: {self.color_palette['black']};
+            }}
         """
-        if selected:
-            button.setStyleSheet(
-                base_style.format(
-                    border_color=self.color_palette["dark_grey"],
-                    background_color=self.color_palette["accent_color"],
-                    text_color=self.color_palette["black"],
-                )
-            )
-        else:
-            button.setStyleSheet(
-                base_style.format(
-                    border_color=self.color_palette["dark_grey"],
-                    background_color=self.color_palette["white"],
-                    text_color=self.color_palette["dark_grey"],
-                )
-            )
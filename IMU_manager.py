@@ -1,48 +1,197 @@
-from mbientlab.metawear import MetaWear, libmetawear, cbindings
+try:
+    from mbientlab.metawear import MetaWear, libmetawear, cbindings
+except ImportError:  # no MetaWear SDK: only simulated devices (IMU_simulator)
+    MetaWear = libmetawear = cbindings = None
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer
-import numpy as np
+from ring_buffer import RingBuffer
+import instrumentation
+from collections import deque
 from time import time
 
+# Seconds of raw history kept per device and sensor
+RETENTION_SECONDS = 60.0
+# Device-to-host clock offset is the minimum seen over this much device time
+OFFSET_WINDOW_S = 10.0
+
+
+class ClockOffsetEstimator:
+    """Maps one board's sample clock onto the host ``time()`` timeline.
+
+    A sample stamped ``device_time`` by the board reaches Python at
+    ``host_time = device_time + offset + delay`` with a variable, positive
+    transport delay (BLE batching, GIL). The smallest ``host_time -
+    device_time`` seen is the sample that waited least, so it is the best
+    offset estimate (min-delay filter). Taking the minimum over a sliding
+    window of ``window_s`` keeps tracking the slow drift between the clocks.
+    Amortized O(1) per sample (monotonic queue)."""
+
+    def __init__(self, window_s=OFFSET_WINDOW_S):
+        self.window_s = window_s
+        self.offset = None
+        self._candidates = deque()  # (device_time, offset), offsets increasing
+
+    def update(self, device_time, host_time):
+        """Feed one sample; returns its timestamp on the host timeline."""
+        candidate = host_time - device_time
+        while self._candidates and self._candidates[-1][1] >= candidate:
+            self._candidates.pop()
+        self._candidates.append((device_time, candidate))
+        while self._candidates[0][0] < device_time - self.window_s:
+            self._candidates.popleft()
+        self.offset = self._candidates[0][1]
+        return device_time + self.offset
+
 
 class SensorCallback:
-    def __init__(self, data):
+    """Appends incoming samples to one device's accel/gyro buffers.
+
+    The MetaWear handlers only decode the ctypes payload and stamp it with
+    the board's own sample epoch mapped to host time (``stamp``);
+    ``add_accel_sample`` / ``add_gyro_sample`` are the shared entry point
+    also used by the simulated devices in IMU_simulator."""
+
+    def __init__(self, data, name="device"):
         self.data = data
-        self.accel_callback = cbindings.FnVoid_VoidP_DataP(self.handle_accel_data)
-        self.gyro_callback = cbindings.FnVoid_VoidP_DataP(self.handle_gyro_data)
+        self.clock = ClockOffsetEstimator()  # accel and gyro share the board clock
+        self.last_stamp = {"accel": -float("inf"), "gyro": -float("inf")}
+        self.accel_counter = f"samples.{name}.accel"  # instrumentation
+        self.gyro_counter = f"samples.{name}.gyro"
+        if cbindings is not None:
+            self.accel_callback = cbindings.FnVoid_VoidP_DataP(self.handle_accel_data)
+            self.gyro_callback = cbindings.FnVoid_VoidP_DataP(self.handle_gyro_data)
+
+    def add_accel_sample(self, timestamp, x, y, z):
+        with instrumentation.span("callback.accel"):
+            self.data["accel"].append((timestamp, x, y, z))
+        instrumentation.count(self.accel_counter)
+
+    def add_gyro_sample(self, timestamp, x, y, z):
+        with instrumentation.span("callback.gyro"):
+            self.data["gyro"].append((timestamp, x, y, z))
+        instrumentation.count(self.gyro_counter)
+
+    def stamp(self, sensor, device_time, host_time):
+        """Host-timeline timestamp of a sample the board stamped ``device_time``.
+
+        Kept non-decreasing per sensor: while the offset estimate settles
+        after connecting it can still step back by more than a sample."""
+        timestamp = max(
+            self.clock.update(device_time, host_time), self.last_stamp[sensor]
+        )
+        self.last_stamp[sensor] = timestamp
+        return timestamp
 
     def handle_accel_data(self, context, data):
         accel_value = cbindings.CartesianFloat.from_address(data.contents.value)
-        current_time = time()
-        self.data["accel"] = np.append(
-            self.data["accel"],
-            [[current_time, accel_value.x, accel_value.y, accel_value.z]],
-            axis=0,
-        )
+        timestamp = self.stamp("accel", data.contents.epoch / 1000.0, time())
+        self.add_accel_sample(timestamp, accel_value.x, accel_value.y, accel_value.z)
 
     def handle_gyro_data(self, context, data):
         gyro_value = cbindings.CartesianFloat.from_address(data.contents.value)
-        current_time = time()
-        self.data["gyro"] = np.append(
-            self.data["gyro"],
-            [[current_time, gyro_value.x, gyro_value.y, gyro_value.z]],
-            axis=0,
+        timestamp = self.stamp("gyro", data.contents.epoch / 1000.0, time())
+        self.add_gyro_sample(timestamp, gyro_value.x, gyro_value.y, gyro_value.z)
+
+
+class MetaWearBoard:
+    """One MetaWear board: blocking connect / configure / disconnect steps.
+
+    Owns the device's ring buffers in ``data[address]`` and its
+    SensorCallback. The steps block (BLE), so connection_manager runs them
+    on worker threads; FakeBoard in IMU_simulator has the same interface."""
+
+    def __init__(self, address, data, retention_s=RETENTION_SECONDS):
+        if MetaWear is None:
+            raise RuntimeError(
+                "mbientlab is not installed; use IMU_simulator for simulated devices"
+            )
+        self.address = address
+        self.device = MetaWear(self.address)
+        data[self.address] = {
+            "accel": RingBuffer.for_horizon(retention_s),
+            "gyro": RingBuffer.for_horizon(retention_s),
+        }
+        self.callback = SensorCallback(data[self.address], self.address)
+
+    @property
+    def is_connected(self):
+        return self.device.is_connected
+
+    def connect(self):
+        """One connection attempt; raises if the board did not connect."""
+        self.device.connect()
+        if not self.device.is_connected:
+            raise ConnectionError(f"{self.address} did not connect")
+
+    def watch_disconnect(self, callback):
+        """Call ``callback()`` (on an SDK thread) when the link drops."""
+        self.device.on_disconnect = lambda status: callback()
+
+    def configure(self):
+        """Set up 100 Hz accel + gyro streaming into the callback (raises on error)."""
+        # zSet connection parameters
+        libmetawear.mbl_mw_settings_set_connection_parameters(
+            self.device.board, 7.5, 7.5, 0, 6000
         )
 
+        # Configure accelerometer
+        libmetawear.mbl_mw_acc_bmi160_set_odr(
+            self.device.board, cbindings.AccBmi160Odr._100Hz
+        )  # BMI160-specific call
+        libmetawear.mbl_mw_acc_bosch_set_range(
+            self.device.board, cbindings.AccBoschRange._8G
+        )
+        libmetawear.mbl_mw_acc_write_acceleration_config(self.device.board)
+        acc_signal = libmetawear.mbl_mw_acc_get_acceleration_data_signal(
+            self.device.board
+        )
+
+        # Configure gyroscope (matches your friend's code)
+        libmetawear.mbl_mw_gyro_bmi160_set_range(
+            self.device.board, cbindings.GyroBoschRange._1000dps
+        )
+        libmetawear.mbl_mw_gyro_bmi160_set_odr(
+            self.device.board, cbindings.GyroBoschOdr._100Hz
+        )
+        libmetawear.mbl_mw_gyro_bmi160_write_config(self.device.board)
+        gyro_signal = libmetawear.mbl_mw_gyro_bmi160_get_rotation_data_signal(
+            self.device.board
+        )
+
+        # Subscribe to signals
+        libmetawear.mbl_mw_datasignal_subscribe(
+            gyro_signal, None, self.callback.gyro_callback
+        )
+        libmetawear.mbl_mw_datasignal_subscribe(
+            acc_signal, None, self.callback.accel_callback
+        )
+
+        # Start data sampling
+        libmetawear.mbl_mw_acc_enable_acceleration_sampling(self.device.board)
+        libmetawear.mbl_mw_acc_start(self.device.board)
+        libmetawear.mbl_mw_gyro_bmi160_enable_rotation_sampling(self.device.board)
+        libmetawear.mbl_mw_gyro_bmi160_start(self.device.board)
+        print(f"Configuration succeeded for {self.address}")
+
+    def disconnect(self):
+        self.device.disconnect()
+
 
 class IMUDataThread(QThread):
+    """Connects and configures one board on its own thread (sequential retries).
+
+    connection_manager.ConnectionManagerThread handles all boards at once
+    with backoff and reconnects; this stays for single-board use."""
+
     connection_status = pyqtSignal(str, bool)  # Signal for connection status
 
-    def __init__(self, address, data):
+    def __init__(self, address, data, retention_s=RETENTION_SECONDS):
         super().__init__()
+        self.board = MetaWearBoard(address, data, retention_s)
         self.address = address
-        self.device = MetaWear(self.address)
+        self.device = self.board.device
         self.running = True
         self.data = data
-        self.data[self.address] = {
-            "accel": np.empty((0, 4), dtype=float),
-            "gyro": np.empty((0, 4), dtype=float),
-        }
-        self.callback = SensorCallback(self.data[self.address])
+        self.callback = self.board.callback
 
     def run(self):
         if self.connect_device() and self.configure_device():
@@ -69,49 +218,7 @@ class IMUDataThread(QThread):
 
     def configure_device(self):
         try:
-            # zSet connection parameters
-            libmetawear.mbl_mw_settings_set_connection_parameters(
-                self.device.board, 7.5, 7.5, 0, 6000
-            )
-
-            # Configure accelerometer
-            libmetawear.mbl_mw_acc_bmi160_set_odr(
-                self.device.board, cbindings.AccBmi160Odr._100Hz
-            )  # BMI160-specific call
-            libmetawear.mbl_mw_acc_bosch_set_range(
-                self.device.board, cbindings.AccBoschRange._8G
-            )
-            libmetawear.mbl_mw_acc_write_acceleration_config(self.device.board)
-            acc_signal = libmetawear.mbl_mw_acc_get_acceleration_data_signal(
-                self.device.board
-            )
-
-            # Configure gyroscope (matches your friend's code)
-            libmetawear.mbl_mw_gyro_bmi160_set_range(
-                self.device.board, cbindings.GyroBoschRange._1000dps
-            )
-            libmetawear.mbl_mw_gyro_bmi160_set_odr(
-                self.device.board, cbindings.GyroBoschOdr._100Hz
-            )
-            libmetawear.mbl_mw_gyro_bmi160_write_config(self.device.board)
-            gyro_signal = libmetawear.mbl_mw_gyro_bmi160_get_rotation_data_signal(
-                self.device.board
-            )
-
-            # Subscribe to signals
-            libmetawear.mbl_mw_datasignal_subscribe(
-                gyro_signal, None, self.callback.gyro_callback
-            )
-            libmetawear.mbl_mw_datasignal_subscribe(
-                acc_signal, None, self.callback.accel_callback
-            )
-
-            # Start data sampling
-            libmetawear.mbl_mw_acc_enable_acceleration_sampling(self.device.board)
-            libmetawear.mbl_mw_acc_start(self.device.board)
-            libmetawear.mbl_mw_gyro_bmi160_enable_rotation_sampling(self.device.board)
-            libmetawear.mbl_mw_gyro_bmi160_start(self.device.board)
-            print(f"Configuration succeeded for {self.address}")
+            self.board.configure()
             return True
 
         except Exception as e:
@@ -0,0 +1,406 @@
+"""Simulated MetaWear devices for running the pipeline without BLE hardware.
+
+A *recording* is ``{device_name: {"accel": (N, 4), "gyro": (N, 4)}}`` with
+rows ``[timestamp, x, y, z]`` in sensor units (accel in g, gyro in °/s),
+keyed by the names used in ``DEVICE_INFO`` ("Wrist", "Lower Back", "Thigh").
+It can be spliced together from the raw windows of a saved session or
+synthesized. ``SimulatedIMUThread`` is a drop-in for ``IMUDataThread``: it
+fills the same ``data[address]`` ring buffers through ``SensorCallback``,
+at real time (``speed=1``), any multiple of it, or as fast as possible
+(``speed=None``). ``FakeBoard`` instead mimics a board behind a BLE link
+(slow or failing connects, dropped links) for connection_manager.
+"""
+
+import os
+import threading
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from time import time, sleep
+
+from IMU_manager import RETENTION_SECONDS, SensorCallback
+from ring_buffer import SAMPLE_RATE_HZ, RingBuffer
+
+# Session signal prefix -> device name used by DEVICE_INFO / capture_jump
+DEVICE_NAMES = {"lower_back": "Lower Back", "wrist": "Wrist", "thigh": "Thigh"}
+SENSORS = ("accel", "gyro")
+
+# Recording time delivered per step when running as fast as possible
+FAST_STEP_S = 0.1
+
+
+# -------------------- RECORDINGS --------------------
+def recording_from_session(filename, gap_s=2.0, rate_hz=SAMPLE_RATE_HZ):
+    """Splice the raw windows of a saved session (.jcs or .pkl) into streams.
+
+    Jump windows are separated (and followed) by ``gap_s`` seconds of rest,
+    held at the nearest window sample and sampled at ``rate_hz``. A sample
+    history or raw log directory is replayed as recorded instead."""
+    if os.path.isdir(filename):
+        from recover_session import read_recording
+
+        return read_recording(filename)
+
+    if filename.endswith(".pkl"):
+        from session_io import load_pickle
+
+        windows = [j.raw_windows() for j in load_pickle(filename, recalc=False)]
+    else:
+        from session_io import SessionReader
+
+        reader = SessionReader(filename)
+        windows = [reader.raw_windows(i) for i in range(len(reader))]
+
+    parts = {(name, s): [] for name in DEVICE_NAMES.values() for s in SENSORS}
+    offset = 0.0  # recording time at which the next window starts
+    for raw in windows:
+        t0 = min(raw[f"{d}_{s}"][0, 0] for d in DEVICE_NAMES for s in SENSORS)
+        t1 = max(raw[f"{d}_{s}"][-1, 0] for d in DEVICE_NAMES for s in SENSORS)
+        for device, name in DEVICE_NAMES.items():
+            for sensor in SENSORS:
+                win = np.array(raw[f"{device}_{sensor}"], dtype=float)
+                if sensor == "accel":
+                    win[:, 1:] /= 9.81  # sessions store m/s², devices send g
+                win[:, 0] += offset + gap_s - t0
+                rest = _rest(win[0], offset, offset + gap_s, rate_hz)
+                parts[(name, sensor)] += [rest, win]
+        offset += gap_s + (t1 - t0) + 1.0 / rate_hz
+
+    for (name, sensor), blocks in parts.items():
+        if blocks:  # trailing rest so the last capture window can complete
+            blocks.append(_rest(blocks[-1][-1], offset, offset + gap_s, rate_hz))
+
+    return {
+        name: {
+            s: np.concatenate(parts[(name, s)]) if windows else np.empty((0, 4))
+            for s in SENSORS
+        }
+        for name in DEVICE_NAMES.values()
+    }
+
+
+def _rest(row, start, end, rate_hz):
+    """Constant ``row`` values sampled on ``[start, end)``."""
+    ts = np.arange(start, end, 1.0 / rate_hz)
+    block = np.repeat(np.asarray(row, dtype=float)[None, :], len(ts), axis=0)
+    block[:, 0] = ts
+    return block
+
+
+def synthesize_recording(
+    n_jumps=10, interval_s=4.0, rate_hz=SAMPLE_RATE_HZ, noise=0.02, seed=0
+):
+    """Synthetic streams with ``n_jumps`` countermovement jumps.
+
+    Each jump is a dip, a push-off well above the detector's 2 g threshold,
+    ~0.45 s of free fall and a landing spike on the sensors' x axis (gravity
+    axis), with matching knee/arm rotation on the gyro z axis. Seeded, so
+    every run produces the same samples."""
+    rng = np.random.default_rng(seed)
+    duration = (n_jumps + 1) * interval_s
+    ts = np.arange(0.0, duration, 1.0 / rate_hz)
+
+    def pulse(center, width, height):
+        return height * np.exp(-0.5 * ((ts - center) / width) ** 2)
+
+    ax = np.ones_like(ts)  # standing still: 1 g along x
+    gz = np.zeros_like(ts)
+    for k in range(n_jumps):
+        t = interval_s * (k + 1)  # take-off
+        ax += pulse(t - 0.35, 0.08, -0.6)  # countermovement dip
+        ax += pulse(t - 0.12, 0.06, 1.8)  # push-off
+        ax[(ts > t) & (ts < t + 0.45)] = 0.0  # flight
+        ax += pulse(t + 0.5, 0.03, 3.5)  # landing impact
+        gz += pulse(t - 0.3, 0.1, -250.0) + pulse(t + 0.55, 0.08, 300.0)
+
+    recording = {}
+    for i, name in enumerate(DEVICE_NAMES.values()):
+        scale = 1.0 + 0.25 * i  # devices do not move identically
+
+        def axes(x, y, z):
+            xyz = np.column_stack([x, y, z])
+            return np.column_stack([ts, xyz + rng.normal(0.0, noise, xyz.shape)])
+
+        zeros = np.zeros_like(ts)
+        recording[name] = {
+            "accel": axes(ax, zeros, zeros),
+            "gyro": axes(zeros, zeros, scale * gz),
+        }
+    return recording
+
+
+# -------------------- REPLAY --------------------
+class ReplayDevice:
+    """Feeds one device's recorded streams into ``data[address]``.
+
+    Samples go through ``SensorCallback`` exactly like live MetaWear data.
+    Timestamps are moved so the recording starts at ``start_time`` but keep
+    their recorded spacing, so detection sees the same signal at any speed.
+    ``origin`` is the recording time moved to ``start_time`` (default: this
+    device's first sample); devices replayed together share it.
+    With ``delay_s`` they are treated as board timestamps instead: each
+    sample gets a random transport delay (exponential, mean ``delay_s``) and
+    is stamped through the callback's clock-offset estimator."""
+
+    def __init__(
+        self,
+        address,
+        data,
+        streams,
+        start_time,
+        retention_s,
+        delay_s=None,
+        seed=0,
+        origin=None,
+    ):
+        self.address = address
+        self.data = data
+        self.delay_s = delay_s
+        self.rng = np.random.default_rng(seed)
+        self.data[address] = {
+            "accel": RingBuffer.for_horizon(retention_s),
+            "gyro": RingBuffer.for_horizon(retention_s),
+        }
+        self.callback = SensorCallback(self.data[address], address)
+
+        if origin is None:
+            origin = min(s[0, 0] for s in streams.values() if len(s))
+        self.streams = {}
+        for sensor, stream in streams.items():
+            stream = np.array(stream, dtype=float)
+            stream[:, 0] += start_time - origin
+            self.streams[sensor] = stream
+        self.cursor = {sensor: 0 for sensor in self.streams}
+        self.end_time = max(s[-1, 0] for s in self.streams.values() if len(s))
+
+    @property
+    def done(self):
+        return all(self.cursor[s] == len(self.streams[s]) for s in self.streams)
+
+    def deliver_until(self, t):
+        """Deliver every sample stamped ``<= t``; returns how many were sent."""
+        add = {
+            "accel": self.callback.add_accel_sample,
+            "gyro": self.callback.add_gyro_sample,
+        }
+        sent = 0
+        for sensor, stream in self.streams.items():
+            lo = self.cursor[sensor]
+            hi = lo + np.searchsorted(stream[lo:, 0], t, side="right")
+            for row in stream[lo:hi]:
+                if self.delay_s:
+                    arrival = row[0] + self.rng.exponential(self.delay_s)
+                    row = (self.callback.stamp(sensor, row[0], arrival), *row[1:])
+                add[sensor](*row)
+            self.cursor[sensor] = hi
+            sent += hi - lo
+        return sent
+
+    def skip_until(self, t):
+        """Drop every sample stamped ``<= t`` undelivered (link down)."""
+        for sensor, stream in self.streams.items():
+            lo = self.cursor[sensor]
+            self.cursor[sensor] = lo + np.searchsorted(stream[lo:, 0], t, side="right")
+
+
+class SimulatedIMUThread(QThread):
+    """Drop-in replacement for ``IMUDataThread`` replaying a recording.
+
+    ``speed`` is the replay rate relative to real time (``None``: as fast as
+    possible). Threads given the same ``start_time`` stay aligned. When
+    running faster than real time the detector must keep up within the
+    ring buffer's retention horizon."""
+
+    connection_status = pyqtSignal(str, bool)  # Signal for connection status
+
+    def __init__(
+        self,
+        address,
+        data,
+        streams,
+        speed=1.0,
+        start_time=None,
+        retention_s=RETENTION_SECONDS,
+        delay_s=None,
+        seed=0,
+        origin=None,
+    ):
+        super().__init__()
+        self.address = address
+        self.speed = speed
+        self.running = True
+        self.start_time = time() if start_time is None else start_time
+        self.device = ReplayDevice(
+            address, data, streams, self.start_time, retention_s, delay_s, seed, origin
+        )
+
+    def run(self):
+        self.connection_status.emit(self.address, True)
+        wall_start = time()
+        sim_time = self.start_time
+        while self.running and not self.device.done:
+            if self.speed is None:
+                sim_time += FAST_STEP_S
+                self.device.deliver_until(sim_time)
+                sleep(0)  # let the detector and GUI threads run
+                continue
+            sim_time = self.start_time + (time() - wall_start) * self.speed
+            self.device.deliver_until(sim_time)
+            sleep(0.005)
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+
+def simulated_devices(device_info, data, recording, speed=1.0, delay_s=None):
+    """One (not yet started) SimulatedIMUThread per device, sharing one clock.
+
+    ``delay_s`` simulates BLE transport delay on top of board timestamps."""
+    start_time = time()
+    origin = min(  # keeps the devices' relative timing (e.g. staggered connects)
+        s[0, 0]
+        for name in device_info.values()
+        for s in recording[name].values()
+        if len(s)
+    )
+    threads = []
+    for seed, (address, name) in enumerate(device_info.items()):
+        thread = SimulatedIMUThread(
+            address,
+            data,
+            recording[name],
+            speed=speed,
+            start_time=start_time,
+            delay_s=delay_s,
+            seed=seed,
+            origin=origin,
+        )
+        threads.append(thread)
+    return threads
+
+
+# -------------------- FAKE BLE BOARDS --------------------
+class FakeBoard:
+    """Stand-in for IMU_manager.MetaWearBoard with a simulated BLE link.
+
+    ``connect`` takes a random ``connect_s`` (low, high) seconds and fails
+    with probability ``failure_rate``; ``hang_rate`` makes an attempt hang
+    for ``hang_s`` (to exercise timeouts). Once configured, the recording
+    streams in real time; samples stamped while the link is down are lost,
+    as on a real board. With ``drop_every_s`` the link drops after that many
+    seconds of streaming."""
+
+    def __init__(
+        self,
+        address,
+        data,
+        streams,
+        start_time=None,
+        origin=None,
+        connect_s=(0.2, 1.0),
+        configure_s=0.1,
+        failure_rate=0.0,
+        hang_rate=0.0,
+        hang_s=30.0,
+        drop_every_s=None,
+        retention_s=RETENTION_SECONDS,
+        seed=0,
+    ):
+        self.address = address
+        self.connect_s = connect_s
+        self.configure_s = configure_s
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.drop_every_s = drop_every_s
+        self.rng = np.random.default_rng(seed)
+        self.start_time = time() if start_time is None else start_time
+        self.device = ReplayDevice(
+            address, data, streams, self.start_time, retention_s, origin=origin
+        )
+        self.callback = self.device.callback
+        self.connected = False
+        self.streaming = False
+        self.streaming_since = 0.0
+        self.attempts = 0
+        self._on_disconnect = None
+        self._running = True
+        self._streamer = threading.Thread(
+            target=self._stream, name=f"FakeBoard {address}", daemon=True
+        )
+        self._streamer.start()
+
+    @property
+    def is_connected(self):
+        return self.connected
+
+    def connect(self):
+        self.attempts += 1
+        if self.rng.random() < self.hang_rate:
+            sleep(self.hang_s)
+        sleep(self.rng.uniform(*self.connect_s))
+        if self.rng.random() < self.failure_rate:
+            raise ConnectionError(f"simulated connect failure ({self.address})")
+        self.connected = True
+
+    def watch_disconnect(self, callback):
+        self._on_disconnect = callback
+
+    def configure(self):
+        if not self.connected:
+            raise ConnectionError(f"{self.address} is not connected")
+        sleep(self.configure_s)
+        self.streaming_since = time()
+        self.streaming = True
+
+    def drop(self):
+        """Simulate losing the link."""
+        was_connected = self.connected
+        self.connected = self.streaming = False
+        if was_connected and self._on_disconnect is not None:
+            self._on_disconnect()
+
+    def disconnect(self):
+        self.drop()  # the SDK reports requested disconnects to the watcher too
+
+    def _stream(self):
+        while self._running and not self.device.done:
+            now = time()
+            if self.streaming:
+                self.device.deliver_until(now)
+                if (
+                    self.drop_every_s
+                    and now - self.streaming_since >= self.drop_every_s
+                ):
+                    self.drop()
+            else:
+                self.device.skip_until(now)
+            sleep(0.005)
+
+    def stop(self):
+        self._running = False
+        self.disconnect()
+
+
+def fake_boards(device_info, data, recording, **link):
+    """One FakeBoard per device on a shared clock; ``link`` goes to FakeBoard."""
+    start_time = time()
+    origin = min(
+        s[0, 0]
+        for name in device_info.values()
+        for s in recording[name].values()
+        if len(s)
+    )
+    return [
+        FakeBoard(
+            address,
+            data,
+            recording[name],
+            start_time=start_time,
+            origin=origin,
+            seed=seed,
+            **link,
+        )
+        for seed, (address, name) in enumerate(device_info.items())
+    ]
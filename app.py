@@ -1,15 +1,34 @@
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QApplication, QProgressDialog, QShortcut
+from PyQt5.QtGui import QKeySequence
 from GUI_MainApp import MainApp
-from IMU_manager import IMUDataThread
-from jump_detection import JumpDetectionThread, Jump
-from time import sleep
+from IMU_manager import MetaWearBoard
+from connection_manager import ConnectionManagerThread
+from IMU_simulator import recording_from_session, simulated_devices
+from IMU_simulator import synthesize_recording
+from detection_thread import JumpDetectionThread
+from jump_detection import PersonalBestIndex
+from jump_journal import JumpJournal
+from raw_recorder import RawRecorder
+from sample_history import SampleHistory
+from session_io import load_pickle, load_session, open_session, save_session
+import instrumentation
 import pickle
 
 # -------------------- CONFIG --------------------
 IMPORT_JUMPS = True
 EXPORT_JUMPS = True
+LAZY_IMPORT = True  # memory-map .jcs sessions, build jumps only when shown
+IMPORT_WORKERS = None  # processes used to rebuild imported jumps (None: all cores)
 INPUT_FILENAME = "May5/Zengwhen4.pkl"
-OUTPUT_FILENAME = "May5/Zhengyu.pkl"
+OUTPUT_FILENAME = "May5/Zhengyu.jcs"
+# Every raw sample is kept on disk in one of two stores (see recover_session.py):
+HISTORY_DIR = "May5/Zhengyu_history"  # compressed chunks; a crash loses <= 10 s
+RAW_LOG_DIR = None  # uncompressed log losing <= 0.5 s, instead of HISTORY_DIR
+JOURNAL_FILENAME = OUTPUT_FILENAME + ".journal"  # per-jump autosave (None: off)
+SIMULATE = None  # None: boards; "synthetic", a session file or raw log to replay
+SIMULATION_SPEED = 1.0  # x real time; None replays as fast as possible
+TRACE_AT_START = False  # record spans/counters from launch (Ctrl+Shift+T toggles)
+TRACE_FILENAME = "jumpcoach_trace.json"  # Chrome trace written when tracing stops
 
 DEVICE_INFO = {
     "FA:6C:EB:21:F6:9A": "Wrist",
@@ -19,61 +38,125 @@ DEVICE_INFO = {
 
 
 # -------------------- IO UTILS --------------------
-def load_jumps(filename, *, recalc=True):
+def load_jumps(filename, *, recalc=True, lazy=False, workers=None, progress=None):
     """Return a list of Jump objects.
-    If recalc=True we rebuild every Jump from the raw 6‑axis IMU arrays."""
-    with open(filename, "rb") as f:
-        loaded = pickle.load(f)
-
-    if not recalc:  # keep old behaviour if you ever need it
-        return loaded
-
-    rebuilt = []
-    for i, j in enumerate(loaded):  # j is the pickled Jump
-        rebuilt.append(
-            Jump(
-                lower_back_accel=j.lower_back_accel,
-                lower_back_gyro=j.lower_back_gyro,
-                wrist_accel=j.wrist_accel,
-                wrist_gyro=j.wrist_gyro,
-                thigh_accel=j.thigh_accel,
-                thigh_gyro=j.thigh_gyro,
-                detected_time=j.detected_time,
-                partition=j.partition,
-                imported=True,
-            )
-        )
-    return rebuilt
+    Session files (.jcs) are rebuilt from their raw arrays, or with lazy=True
+    memory-mapped and only built when shown (unless their stored metrics are
+    outdated); for legacy pickles, recalc=True
+    rebuilds every Jump from the raw 6‑axis IMU arrays.
+    Rebuilds run on ``workers`` processes (default: all cores) and report
+    ``progress(done, total)``."""
+    if not filename.endswith(".pkl"):
+        if lazy:
+            return open_session(filename, workers=workers, progress=progress)
+        return load_session(filename, workers=workers, progress=progress)
+
+    return load_pickle(filename, recalc=recalc, workers=workers, progress=progress)
+
+
+def import_with_progress(filename):
+    """load_jumps() behind a progress dialog (needs a running QApplication)."""
+    dialog = QProgressDialog(f"Importing {filename}…", None, 0, 0)
+    dialog.setWindowTitle("JumpCoach")
+    dialog.setMinimumDuration(500)
+
+    def progress(done, total):
+        dialog.setMaximum(total)
+        dialog.setValue(done)
+        QApplication.processEvents()
+
+    jumps = load_jumps(
+        filename, lazy=LAZY_IMPORT, workers=IMPORT_WORKERS, progress=progress
+    )
+    dialog.close()
+    return jumps
+
+
+def toggle_tracing():
+    """Start recording a trace, or stop and write it to TRACE_FILENAME."""
+    if instrumentation.is_enabled():
+        instrumentation.disable()
+        instrumentation.export_chrome_trace(TRACE_FILENAME)
+        instrumentation.print_summary()
+    else:
+        instrumentation.reset()
+        instrumentation.enable()
+        print("Tracing started (Ctrl+Shift+T to stop and export)")
 
 
 def save_jumps(jumps, filename):
-    with open(filename, "wb") as f:
-        pickle.dump(jumps, f)
+    if filename.endswith(".pkl"):
+        with open(filename, "wb") as f:
+            pickle.dump(jumps, f)
+    else:
+        save_session(jumps, filename)
     print(f"Exported {len(jumps)} jumps to {filename}")
 
 
 # -------------------- MAIN APP --------------------
 def main():
     data = {}
-    jumps = load_jumps(INPUT_FILENAME) if IMPORT_JUMPS else []
-    print(f"Imported {len(jumps)} jumps") if IMPORT_JUMPS else None
-
     app = QApplication([])
-
-    window = MainApp(DEVICE_INFO, data, jumps)
+    if TRACE_AT_START:
+        instrumentation.enable()
+
+    # A journal left behind means the last session did not exit cleanly
+    journal = JumpJournal(JOURNAL_FILENAME) if JOURNAL_FILENAME else None
+    restored = bool(journal and journal.exists)
+    if restored:
+        # The journal references the input file and replays its events on it
+        jumps = journal.load(import_with_progress, workers=IMPORT_WORKERS)
+        print(f"Recovered {len(jumps)} jumps from {JOURNAL_FILENAME}")
+    else:
+        jumps = import_with_progress(INPUT_FILENAME) if IMPORT_JUMPS else []
+        print(f"Imported {len(jumps)} jumps") if IMPORT_JUMPS else None
+        if journal:
+            journal.start(jumps, INPUT_FILENAME if IMPORT_JUMPS else None)
+
+    leaderboard = PersonalBestIndex.from_jumps(jumps)  # shared PB index
+
+    window = MainApp(DEVICE_INFO, data, jumps, leaderboard, journal)
     window.show()
+    QShortcut(QKeySequence("Ctrl+Shift+T"), window, activated=toggle_tracing)
+
+    # Raw history older than the ring buffers goes to compressed chunks on disk
+    history = SampleHistory(HISTORY_DIR, DEVICE_INFO) if HISTORY_DIR else None
+    recorder = RawRecorder(RAW_LOG_DIR, DEVICE_INFO) if RAW_LOG_DIR else None
+    if history and recorder:
+        print("⚠️  HISTORY_DIR and RAW_LOG_DIR both write every sample to disk")
 
     # Start IMU threads
     threads = []
-    for address in DEVICE_INFO:
-        thread = IMUDataThread(address, data)
+    if SIMULATE:
+        recording = (
+            synthesize_recording()
+            if SIMULATE == "synthetic"
+            else recording_from_session(SIMULATE)
+        )
+        threads.extend(
+            simulated_devices(DEVICE_INFO, data, recording, SIMULATION_SPEED)
+        )
+        for writer in (history, recorder):
+            if writer:
+                writer.attach(data)
+        for thread in threads:
+            thread.connection_status.connect(window.connecting_widget.update_status)
+            thread.start()
+    else:
+        # All boards connect concurrently, with backoff and automatic reconnects
+        boards = [MetaWearBoard(address, data) for address in DEVICE_INFO]
+        for writer in (history, recorder):
+            if writer:
+                writer.attach(data)
+        thread = ConnectionManagerThread(boards)
         thread.connection_status.connect(window.connecting_widget.update_status)
         thread.start()
         threads.append(thread)
-        sleep(0.1)
 
     # Start Jump Detection thread
-    jump_thread = JumpDetectionThread(DEVICE_INFO, data, jumps, IMPORT_JUMPS)
+    jump_thread = JumpDetectionThread(
+        DEVICE_INFO, data, jumps, IMPORT_JUMPS or restored, leaderboard, journal
+    )
     jump_thread.jump_detected.connect(window.jump_analyzer.selector_widget.update_ui)
     jump_thread.first_jump_detected.connect(
         lambda: window.jump_analyzer.toggle_ui(True)
@@ -81,12 +164,21 @@ def main():
     jump_thread.start()
 
     app.exec_()
+    if instrumentation.is_enabled():
+        toggle_tracing()  # write the trace of this session
 
     if EXPORT_JUMPS:
         save_jumps(jumps, OUTPUT_FILENAME)
+        if journal:
+            journal.discard()  # everything is in OUTPUT_FILENAME now
+    elif journal:
+        journal.close()  # kept: restored on the next start
 
     for thread in threads:
         thread.stop()
+    for writer in (history, recorder):
+        if writer:
+            writer.close()
 
     print("Bye!")
 
@@ -0,0 +1,129 @@
+"""Headless batch re-analysis of saved sessions.
+
+Recomputes ``Jump.calculate_metrics`` for every jump of every session file
+(.jcs or legacy .pkl) under a directory, one file per worker process, and
+writes a single consolidated metrics table::
+
+    python batch_analysis.py sessions/ -o metrics.csv [--workers 8]
+
+Output is CSV, or Parquet when the name ends in .parquet (needs pyarrow).
+Imports no PyQt, so it runs on machines without a display.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from session_io import SESSION_EXTENSION, load_pickle, load_session
+
+SESSION_PATTERNS = (f"*{SESSION_EXTENSION}", "*.pkl")
+INDEX_COLUMNS = [
+    "session",
+    "jump",
+    "detected_time",
+    "takeoff_time",
+    "peak_time",
+    "landing_time",
+]
+
+
+def find_sessions(directory, recursive=True):
+    """All session files below ``directory``, in a stable (sorted) order."""
+    root = Path(directory)
+    finder = root.rglob if recursive else root.glob
+    return sorted({p for pattern in SESSION_PATTERNS for p in finder(pattern)})
+
+
+def analyze_session(path):
+    """Rows of ``{column: value}`` for every jump of one session file."""
+    path = str(path)
+    if path.endswith(".pkl"):
+        jumps = load_pickle(path, workers=1)
+    else:
+        jumps = load_session(path, workers=1)
+
+    rows = []
+    for i, jump in enumerate(jumps):
+        partition = jump.partition or (None, None, None)
+        row = {
+            "session": path,
+            "jump": i + 1,
+            "detected_time": jump.detected_time,
+            "takeoff_time": partition[0],
+            "peak_time": partition[1],
+            "landing_time": partition[2],
+        }
+        for name, value in (jump.metrics or {}).items():
+            row[name] = _cell(value)
+        rows.append(row)
+    return rows
+
+
+def _cell(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None  # non-scalar placeholder such as [0, 0]
+
+
+def analyze_sessions(paths, workers=None):
+    """Analyze ``paths`` on a process pool; rows keep the order of ``paths``."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        results = map(analyze_session, paths)
+        return [row for rows in results for row in rows]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(analyze_session, paths)
+        return [row for rows in results for row in rows]
+
+
+def write_table(rows, filename):
+    """Write rows as one columnar table (.parquet) or CSV (anything else)."""
+    metric_columns = sorted({k for row in rows for k in row} - set(INDEX_COLUMNS))
+    columns = INDEX_COLUMNS + metric_columns
+
+    if filename.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow (pip install pyarrow)")
+        table = pa.table({c: [row.get(c) for row in rows] for c in columns})
+        pq.write_table(table, filename)
+        return
+
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="directory searched for session files")
+    parser.add_argument(
+        "-o", "--output", default="metrics.csv", help="table to write (.csv/.parquet)"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="processes (default: cores)"
+    )
+    parser.add_argument(
+        "--no-recursive", action="store_true", help="only look at the top directory"
+    )
+    args = parser.parse_args(argv)
+
+    paths = find_sessions(args.directory, recursive=not args.no_recursive)
+    if not paths:
+        sys.exit(f"No session files found in {args.directory}")
+
+    rows = analyze_sessions(paths, workers=args.workers)
+    write_table(rows, args.output)
+    print(f"Wrote {len(rows)} jumps from {len(paths)} sessions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
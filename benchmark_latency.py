@@ -0,0 +1,221 @@
+"""End-to-end latency benchmark: sample arrival to feedback on screen.
+
+Replays a recording through simulated devices into the real detection
+thread and main window (offscreen), and times every live jump through the
+pipeline stages::
+
+    arrival → trigger → capture → jump → metrics → emit → feedback → display
+
+``arrival`` is when the triggering lower-back sample reached SensorCallback;
+the other stages are jump_detection.PIPELINE_STAGES. A jump superseded by a
+newer one before the GUI got to it is never displayed, so the GUI stages can
+count fewer jumps at high speeds. Each replay speed
+reports per-stage percentiles (ms) and throughput; results are written as
+JSON and can be compared against a stored baseline::
+
+    python benchmark_latency.py --speeds 1 10 max -o latency.json
+    python benchmark_latency.py --baseline latency.json   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from collections import defaultdict
+from time import perf_counter, sleep
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+from GUI_MainApp import MainApp
+from IMU_simulator import recording_from_session, simulated_devices
+from IMU_simulator import synthesize_recording
+from detection_thread import JumpDetectionThread
+from jump_detection import PIPELINE_STAGES, PersonalBestIndex, set_stage_hook
+
+BASELINE_VERSION = 1
+STAGES = ("arrival",) + PIPELINE_STAGES
+PERCENTILES = (50, 90, 99)
+DEVICE_INFO = {
+    "SIM:00:00:00:00:01": "Wrist",
+    "SIM:00:00:00:00:02": "Lower Back",
+    "SIM:00:00:00:00:03": "Thigh",
+}
+# Wait this long after the replay ends for the last jump to reach the screen
+DRAIN_S = 3.0
+
+
+def run_pipeline(recording, speed, app):
+    """Replay ``recording`` once; return (per-jump stage times, throughput)."""
+    data, jumps = {}, []
+    leaderboard = PersonalBestIndex()
+    window = MainApp(DEVICE_INFO, data, jumps, leaderboard)
+    threads = simulated_devices(DEVICE_INFO, data, recording, speed)
+    detector = JumpDetectionThread(DEVICE_INFO, data, jumps, False, leaderboard)
+    detector.jump_detected.connect(window.jump_analyzer.selector_widget.update_ui)
+    detector.first_jump_detected.connect(lambda: window.jump_analyzer.toggle_ui(True))
+
+    # Stamp the arrival of every lower-back accel sample (keyed by timestamp)
+    arrivals = {}
+    trigger_device = next(
+        t.device for t in threads if DEVICE_INFO[t.address] == "Lower Back"
+    )
+    add_sample = trigger_device.callback.add_accel_sample
+
+    def stamped_add(timestamp, x, y, z):
+        arrivals[timestamp] = perf_counter()
+        add_sample(timestamp, x, y, z)
+
+    trigger_device.callback.add_accel_sample = stamped_add
+
+    stages = defaultdict(dict)  # detected_time -> {stage: perf_counter()}
+
+    def hook(stage, detected_time):
+        stages[detected_time].setdefault(stage, perf_counter())
+
+    set_stage_hook(hook)
+    try:
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        detector.start()
+        while any(t.isRunning() for t in threads):
+            app.processEvents()
+            sleep(0.001)
+        replay_s = perf_counter() - start
+
+        drain_until = perf_counter() + DRAIN_S
+        while perf_counter() < drain_until:
+            app.processEvents()
+            sleep(0.001)
+    finally:
+        set_stage_hook(None)
+        detector.running = False
+        detector.wait()
+        window.close()
+
+    timelines = []
+    for detected_time, marks in sorted(stages.items()):
+        marks["arrival"] = arrivals.get(detected_time)
+        timelines.append(marks)
+
+    n_samples = sum(len(s) for streams in recording.values() for s in streams.values())
+    duration = max(s[-1, 0] - s[0, 0] for r in recording.values() for s in r.values())
+    throughput = {
+        "replay_s": replay_s,
+        "realtime_factor": duration / replay_s,
+        "samples_per_s": n_samples / replay_s,
+        "jumps": len(jumps),
+        "jumps_per_s": len(jumps) / replay_s,
+    }
+    return timelines, throughput
+
+
+def summarize(timelines):
+    """Percentiles (ms) of every stage-to-stage step and of the whole path."""
+    steps = list(zip(STAGES, STAGES[1:])) + [(STAGES[0], STAGES[-1])]
+    summary = {}
+    for a, b in steps:
+        ms = [
+            1000 * (t[b] - t[a])
+            for t in timelines
+            if t.get(a) is not None and t.get(b) is not None
+        ]
+        if not ms:
+            continue
+        stats = {f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES}
+        stats.update(max=float(np.max(ms)), n=len(ms))
+        summary[f"{a}->{b}"] = stats
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """Regressions: steps whose p50/p90 grew by more than ``tolerance`` (and
+    1 ms), and speeds whose realtime factor dropped by more than it."""
+    regressions = []
+    for speed, run in results["runs"].items():
+        base = baseline.get("runs", {}).get(speed)
+        if base is None:
+            continue
+        for step, stats in run["latency_ms"].items():
+            old = base["latency_ms"].get(step)
+            if old is None:
+                continue
+            for p in ("p50", "p90"):
+                if stats[p] > old[p] * (1 + tolerance) + 1.0:
+                    regressions.append(
+                        f"{speed} {step} {p}: {old[p]:.1f} -> {stats[p]:.1f} ms"
+                    )
+        old_rt = base["throughput"]["realtime_factor"]
+        new_rt = run["throughput"]["realtime_factor"]
+        if new_rt < old_rt * (1 - tolerance):
+            regressions.append(f"{speed} realtime factor: {old_rt:.1f} -> {new_rt:.1f}")
+    return regressions
+
+
+def print_run(speed, run):
+    rt = run["throughput"]
+    print(
+        f"\n== speed {speed}: {rt['jumps']} jumps, {rt['realtime_factor']:.1f}x "
+        f"real time, {rt['samples_per_s']:.0f} samples/s =="
+    )
+    for step, stats in run["latency_ms"].items():
+        cells = "  ".join(f"{p}={stats[p]:8.2f}" for p in ("p50", "p90", "p99", "max"))
+        print(f"{step:>20}  {cells}  (n={stats['n']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--source", default="synthetic", help='"synthetic" or a session to replay'
+    )
+    parser.add_argument("--jumps", type=int, default=8, help="synthetic jumps")
+    parser.add_argument(
+        "--speeds", nargs="+", default=["1", "10", "max"], help='x real time or "max"'
+    )
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed relative slowdown"
+    )
+    args = parser.parse_args(argv)
+
+    if args.source == "synthetic":
+        recording = synthesize_recording(n_jumps=args.jumps)
+    else:
+        recording = recording_from_session(args.source)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # no window needed
+    app = QApplication.instance() or QApplication([])
+    results = {
+        "version": BASELINE_VERSION,
+        "source": args.source,
+        "machine": {"python": platform.python_version(), "cpus": os.cpu_count()},
+        "runs": {},
+    }
+    for speed in args.speeds:
+        factor = None if speed == "max" else float(speed)
+        timelines, throughput = run_pipeline(recording, factor, app)
+        run = {"latency_ms": summarize(timelines), "throughput": throughput}
+        results["runs"][f"speed_{speed}"] = run
+        print_run(speed, run)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""Concurrent BLE connection manager for all boards of a session.
+
+Every board is connected and configured at the same time on one asyncio
+loop. The blocking SDK calls run on worker threads, each under a timeout,
+and never overlap on one board: a call that timed out keeps the board busy
+until its thread returns.
+Failed attempts are retried after a jittered exponential backoff, and a
+board whose link drops is reconnected and reconfigured automatically.
+Time to the dashboard is therefore bounded by the slowest board, not the
+sum of all of them.
+
+Boards are anything with MetaWearBoard's interface (``address``,
+``connect()``, ``configure()``, ``disconnect()``, ``is_connected`` and
+``watch_disconnect(callback)``), so the manager runs against
+IMU_simulator.FakeBoard without hardware::
+
+    python connection_manager.py --failure-rate 0.3 --drop-every 5
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+from dataclasses import dataclass
+from time import monotonic, sleep
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+import instrumentation
+
+CONNECT_TIMEOUT_S = 10.0
+CONFIGURE_TIMEOUT_S = 10.0
+BACKOFF_BASE_S = 0.5  # first retry waits up to this long
+BACKOFF_MAX_S = 8.0  # cap of the exponential backoff
+# Fallback check of is_connected for boards that never report a drop
+LINK_POLL_S = 1.0
+
+
+@dataclass
+class ConnectTiming:
+    """Connection timing of one board (seconds)."""
+
+    attempts: int = 0
+    connect_s: float = None  # last successful connect call
+    configure_s: float = None
+    ready_s: float = None  # first ready, since the manager started
+    reconnects: int = 0
+
+
+class ConnectionManager:
+    """Connects, configures and keeps connected a set of boards (see module doc).
+
+    ``on_status(address, connected)`` is called from the loop thread on
+    every change. ``max_attempts=None`` retries forever; otherwise a board
+    that fails that many times in a row is given up."""
+
+    def __init__(
+        self,
+        boards,
+        on_status=None,
+        connect_timeout_s=CONNECT_TIMEOUT_S,
+        configure_timeout_s=CONFIGURE_TIMEOUT_S,
+        backoff_base_s=BACKOFF_BASE_S,
+        backoff_max_s=BACKOFF_MAX_S,
+        max_attempts=None,
+        seed=None,
+    ):
+        self.boards = list(boards)
+        self.on_status = on_status
+        self.connect_timeout_s = connect_timeout_s
+        self.configure_timeout_s = configure_timeout_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.max_attempts = max_attempts
+        self.rng = random.Random(seed)
+        self.timings = {board.address: ConnectTiming() for board in self.boards}
+        self._loop = None
+        self._stopping = None
+        self._stop_requested = False  # stop() before run() got going
+        self._started = None
+        self._busy = {}  # address -> future of the board's last SDK call
+
+    # ---------------------- running ----------------------
+    async def run(self):
+        """Connect every board concurrently, then keep them connected until stop()."""
+        self._stopping = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_requested:
+            self._stopping.set()
+        self._started = monotonic()
+        await asyncio.gather(*(self._maintain(board) for board in self.boards))
+
+    def stop(self):
+        """Stop reconnecting (thread-safe); run() returns shortly after."""
+        self._stop_requested = True  # seen by run() if its loop is not up yet
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                pass  # loop closed in between: run() has returned
+
+    async def _blocking(self, board, func, timeout):
+        """Run a blocking SDK call of ``board`` on its own daemon thread,
+        waiting at most ``timeout`` (TimeoutError) or until stop() (_Stopped).
+
+        A timed-out call cannot be interrupted; its thread is abandoned and
+        never keeps the process alive, but the board's next call waits for
+        it to return."""
+        await self._idle(board)
+        future = self._loop.create_future()
+        future.add_done_callback(_consume)
+        self._busy[board.address] = future
+
+        def call():
+            try:
+                outcome = (func(), None)
+            except Exception as e:
+                outcome = (None, e)
+            try:
+                self._loop.call_soon_threadsafe(_settle, future, *outcome)
+            except RuntimeError:
+                pass  # loop already closed: nobody is waiting any more
+
+        threading.Thread(target=call, name=f"ble {func.__name__}", daemon=True).start()
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            done, _ = await asyncio.wait(
+                [future, stopping], timeout=timeout, return_when="FIRST_COMPLETED"
+            )
+        finally:
+            stopping.cancel()
+        if future in done:
+            return future.result()
+        if self._stopping.is_set():
+            raise _Stopped()
+        raise asyncio.TimeoutError()
+
+    async def _idle(self, board):
+        """Wait until no abandoned SDK call of ``board`` is still running."""
+        busy = self._busy.get(board.address)
+        if busy is None or busy.done():
+            return
+        print(f"Waiting for an abandoned call on {board.address} to return")
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            await asyncio.wait([busy, stopping], return_when="FIRST_COMPLETED")
+        finally:
+            stopping.cancel()
+        if not busy.done():
+            raise _Stopped()
+
+    async def _maintain(self, board):
+        dropped = asyncio.Event()
+        loop = self._loop
+
+        def on_disconnect():  # SDK thread, possibly after run() returned
+            try:
+                loop.call_soon_threadsafe(dropped.set)
+            except RuntimeError:
+                pass  # loop already closed: nobody is waiting any more
+
+        board.watch_disconnect(on_disconnect)
+        while not self._stopping.is_set():
+            if not await self._connect(board):
+                return
+            dropped.clear()
+            await self._wait_for_drop(board, dropped)
+            if self._stopping.is_set():
+                return
+            print(f"Lost {board.address}, reconnecting")
+            self.timings[board.address].reconnects += 1
+            instrumentation.count("ble.reconnects")
+            self._report(board, False)
+
+    async def _wait_for_drop(self, board, dropped):
+        while not (dropped.is_set() or self._stopping.is_set()):
+            if not board.is_connected:
+                return
+            await self._sleep(LINK_POLL_S, dropped)
+
+    async def _connect(self, board):
+        """Connect and configure ``board`` with retries; True once it streams."""
+        timing = self.timings[board.address]
+        failures = 0
+        while not self._stopping.is_set():
+            timing.attempts += 1
+            step = "connect"
+            try:
+                t = monotonic()
+                await self._blocking(board, board.connect, self.connect_timeout_s)
+                timing.connect_s = monotonic() - t
+                step, t = "configure", monotonic()
+                await self._blocking(board, board.configure, self.configure_timeout_s)
+                timing.configure_s = monotonic() - t
+            except _Stopped:
+                return False
+            except asyncio.TimeoutError:
+                print(
+                    f"Attempt {timing.attempts} for {board.address}: {step} timed out"
+                )
+            except Exception as e:
+                print(f"Attempt {timing.attempts} failed for {board.address}: {e}")
+            else:
+                if timing.ready_s is None:
+                    timing.ready_s = monotonic() - self._started
+                print(
+                    f"Connected to {board.address} on attempt {timing.attempts} "
+                    f"(connect {timing.connect_s:.2f} s, "
+                    f"configure {timing.configure_s:.2f} s)"
+                )
+                self._report(board, True)
+                return True
+
+            failures += 1
+            try:  # clean up before the next attempt, never alongside it
+                await self._blocking(board, board.disconnect, self.connect_timeout_s)
+            except _Stopped:
+                return False
+            except Exception:
+                pass  # best effort: the next connect() starts over anyway
+            if self.max_attempts and failures >= self.max_attempts:
+                print(
+                    f"Failed to connect to {board.address} after {failures} attempts."
+                )
+                self._report(board, False)
+                return False
+            # Full jitter: boards failing together do not retry in lockstep
+            cap = min(self.backoff_max_s, self.backoff_base_s * 2 ** (failures - 1))
+            await self._sleep(self.rng.uniform(0, cap))
+        return False
+
+    async def _sleep(self, seconds, wake=None):
+        """Sleep, waking early on stop() (or ``wake``)."""
+        events = [self._stopping] + ([wake] if wake is not None else [])
+        waiters = [asyncio.ensure_future(e.wait()) for e in events]
+        try:
+            await asyncio.wait(waiters, timeout=seconds, return_when="FIRST_COMPLETED")
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    def _report(self, board, connected):
+        if self.on_status is not None:
+            self.on_status(board.address, connected)
+
+    # ---------------------- reporting ----------------------
+    def print_timings(self):
+        print("---- board connections ----")
+        for address, t in self.timings.items():
+            ready = "never" if t.ready_s is None else f"{t.ready_s:6.2f} s"
+            print(
+                f"{address:>20}  ready {ready}  attempts {t.attempts:<3} "
+                f"reconnects {t.reconnects}"
+            )
+
+
+class _Stopped(Exception):
+    """stop() was called while waiting on a board."""
+
+
+def _settle(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _consume(future):
+    """Retrieve the outcome of an abandoned call so asyncio does not log it."""
+    if not future.cancelled():
+        future.exception()
+
+
+def _quiet(func):
+    def call():
+        try:
+            func()
+        except Exception:
+            pass  # best effort cleanup at shutdown
+
+    return call
+
+
+class ConnectionManagerThread(QThread):
+    """Runs a ConnectionManager's event loop next to the Qt event loop.
+
+    Replaces one IMUDataThread per board: ``connection_status`` has the same
+    signature, so GUIConnecting is wired up the same way."""
+
+    connection_status = pyqtSignal(str, bool)
+
+    def __init__(self, boards, **options):
+        super().__init__()
+        self.boards = list(boards)
+        self.manager = ConnectionManager(
+            self.boards, on_status=self.connection_status.emit, **options
+        )
+
+    def run(self):
+        asyncio.run(self.manager.run())
+
+    def stop(self):
+        self.manager.stop()
+        self.wait()
+        for board in self.boards:
+            _quiet(board.disconnect)()
+        self.manager.print_timings()
+
+
+# -------------------- FAKE-BOARD CHECK --------------------
+def main(argv=None):
+    from IMU_simulator import fake_boards, synthesize_recording
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=3)
+    parser.add_argument("--connect", type=float, nargs=2, default=(0.5, 2.0))
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--drop-every", type=float, default=None)
+    parser.add_argument("--seconds", type=float, default=10.0, help="run this long")
+    args = parser.parse_args(argv)
+
+    names = ["Wrist", "Lower Back", "Thigh"]
+    device_info = {f"FAKE:{i:02d}": names[i % len(names)] for i in range(args.boards)}
+    data = {}
+    boards = fake_boards(
+        device_info,
+        data,
+        synthesize_recording(n_jumps=3),
+        connect_s=tuple(args.connect),
+        failure_rate=args.failure_rate,
+        hang_rate=args.hang_rate,
+        hang_s=CONNECT_TIMEOUT_S * 2,
+        drop_every_s=args.drop_every,
+    )
+    manager = ConnectionManager(boards, connect_timeout_s=CONNECT_TIMEOUT_S, seed=0)
+    thread = threading.Thread(target=lambda: asyncio.run(manager.run()))
+    thread.start()
+    sleep(args.seconds)
+    manager.stop()
+    thread.join()
+    for board in boards:
+        board.stop()
+
+    manager.print_timings()
+    ready = [t.ready_s for t in manager.timings.values() if t.ready_s is not None]
+    if ready:
+        print(f"All boards ready after {max(ready):.2f} s")
+    samples = {a: data[a]["accel"].total for a in device_info}
+    print(f"accel samples received: {samples}")
+
+
+if __name__ == "__main__":
+    main()
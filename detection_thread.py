@@ -0,0 +1,150 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from time import time
+
+import instrumentation
+from jump_detection import (
+    CAPTURE_TIMEOUT_S,
+    POST_TRIGGER_S,
+    PRE_TRIGGER_S,
+    PendingCapture,
+    PersonalBestIndex,
+    StreamingJumpDetector,
+    capture_jump,
+    jump_height,
+    mark_stage,
+    recompute_pb_flags,
+)
+
+
+class JumpDetectionThread(QThread):
+    jump_detected = pyqtSignal(int, int, int)
+    first_jump_detected = pyqtSignal()
+
+    def __init__(
+        self,
+        device_info,
+        data,
+        jumps,
+        import_jumps_flag,
+        leaderboard=None,
+        journal=None,
+    ):
+        super().__init__()
+        self.device_info = device_info
+        self.data = data
+        self.jumps = jumps
+        if leaderboard is None:
+            leaderboard = PersonalBestIndex.from_jumps(jumps)
+        self.leaderboard = leaderboard  # shared with GUISelector
+        self.journal = journal  # autosave of accepted jumps (jump_journal)
+        self.running = True
+        self.import_jumps_flag = import_jumps_flag
+        self.detector = StreamingJumpDetector()
+        self.pending_captures = []  # triggers still waiting for post-event data
+        self.trigger_address = next(
+            addr for addr, name in device_info.items() if name == "Lower Back"
+        )
+
+    # ---------------------- main loop ----------------------
+    def run(self):
+        self.detect_jumps()
+
+    def detect_jumps(self):
+        while self.running:
+            # ----- handle restored jumps once -----
+            if self.import_jumps_flag:
+                self.import_jumps_flag = False
+                print("\nRestoring previously imported jumps")
+
+                recompute_pb_flags(self.jumps)  # <-- ensure PB flags are correct
+                self.first_jump_detected.emit()
+
+                last_idx = len(self.jumps) - 1
+                if last_idx >= 0:
+                    self.jump_detected.emit(
+                        last_idx, *self.leaderboard.query_rows(last_idx)
+                    )
+                else:
+                    print("No jumps found in imported data.")
+
+            # ----- live detection from lower‑back accelerometer -----
+            buffer = self.data[self.trigger_address]["accel"]
+            buffer.wait_for_data(timeout=0.1)  # woken by SensorCallback
+            with instrumentation.span("detector.scan"):
+                triggers = self.detector.scan(buffer)
+            for trigger in triggers:
+                mark_stage("trigger", trigger.timestamp)
+                instrumentation.count("detector.triggers")
+                print(
+                    f"Jump detected! (sample {trigger.index} @ {trigger.timestamp:.3f})"
+                )
+                self.pending_captures.append(
+                    PendingCapture(
+                        trigger,
+                        trigger.timestamp - PRE_TRIGGER_S,
+                        trigger.timestamp + POST_TRIGGER_S,
+                    )
+                )
+            self.complete_captures()
+
+    def complete_captures(self):
+        """Process every pending capture whose post‑event window is fully buffered.
+
+        A capture is complete once the newest sample of every device/sensor
+        is past ``post``; a stalled device only delays it by CAPTURE_TIMEOUT_S."""
+        if not self.pending_captures:
+            return
+        newest = min(
+            (self.data[addr][sensor].newest_time() or -float("inf"))
+            for addr in self.device_info
+            for sensor in ("accel", "gyro")
+        )
+        now = time()
+        still_pending = []
+        for capture in self.pending_captures:
+            if newest >= capture.post:
+                self.process_detected_jump(capture)
+            elif now >= capture.post + CAPTURE_TIMEOUT_S:
+                instrumentation.count("detector.capture_timeouts")
+                self.process_detected_jump(capture)
+            else:
+                still_pending.append(capture)
+        self.pending_captures = still_pending
+
+    # ---------------------- process new live jump ----------------------
+    @instrumentation.traced("detector.process_jump")
+    def process_detected_jump(self, capture):
+        j = capture_jump(self.data, self.device_info, capture)
+
+        if j is None or j.metrics is None:
+            print("⚠️  Faulty jump (no valid metrics). Not saving.")
+            instrumentation.count("detector.dropped_triggers")
+            return
+
+        if self.journal is not None:
+            self.journal.register(j)  # its id exists before anyone can delete it
+
+        if not self.jumps:
+            self.first_jump_detected.emit()
+
+        self.jumps.append(j)
+        self.leaderboard.append(jump_height(j))
+
+        idx = len(self.jumps) - 1
+        self.leaderboard.assign(self.jumps, idx)
+        pb_rows = self.leaderboard.query_rows(idx)
+        if hasattr(self, "window"):
+            fb_metrics = self.window.feedback_widget.update_feedback(idx, *pb_rows)
+            j.feedback = self.window.feedback_widget.feedback_label.text()
+            j.feedback_metrics = fb_metrics
+
+        print(
+            f"✅ Jump #{idx + 1} saved with height: {j.metrics.get('height', 0):.2f} m"
+        )
+        self.jump_detected.emit(idx, *pb_rows)
+        mark_stage("emit", j.detected_time)
+        if self.journal is not None:
+            self.journal.add(j)  # after the GUI is notified: fsync adds no latency
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,207 @@
+"""Low-overhead spans and counters for the live jump pipeline.
+
+Off by default: while disabled every hook is one flag check. Switch it on at
+runtime with ``enable()``; events are then kept in memory (bounded) and can
+be written as a Chrome trace (open in chrome://tracing or ui.perfetto.dev)::
+
+    import instrumentation
+    instrumentation.enable()
+    ...
+    instrumentation.export_chrome_trace("session_trace.json")
+    instrumentation.print_summary()
+
+* ``span(name)`` / ``@traced(name)`` – timed sections (callback time, Jump
+  construction, metrics, GUI slots, ...)
+* ``count(name, n)`` – running totals, also traced as per-second rates
+  (samples/s per device, triggers, dropped triggers, ...)
+* ``instant(name)`` – point events, e.g. a jump reaching a pipeline stage
+"""
+
+import json
+import threading
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter_ns
+
+import numpy as np
+
+# Oldest events are dropped past this many (about 100 MB worst case)
+MAX_EVENTS = 1_000_000
+# Counters add a rate sample to the trace at most this often [ns]
+RATE_INTERVAL_NS = 1_000_000_000
+
+_enabled = False
+_events = deque(maxlen=MAX_EVENTS)  # (phase, name, ts_ns, dur_ns, tid, args)
+_counters = {}  # name -> running total
+_rate_marks = {}  # name -> (ts_ns, total) of the last rate sample
+_thread_names = {}
+_lock = threading.Lock()
+_NO_SPAN = nullcontext()
+
+
+# -------------------- SWITCH --------------------
+def enable():
+    """Start recording (keeps events recorded earlier; see ``reset``)."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget all recorded events and counters."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _rate_marks.clear()
+
+
+# -------------------- RECORDING --------------------
+def _thread_id():
+    tid = threading.get_ident()
+    if tid not in _thread_names:
+        _thread_names[tid] = threading.current_thread().name
+    return tid
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = perf_counter_ns()
+        _events.append(
+            ("X", self.name, self.start, end - self.start, _thread_id(), self.args)
+        )
+        return False
+
+
+def span(name, **args):
+    """Context manager timing one named section (no-op while disabled)."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def traced(name):
+    """Decorator: run every call of the function inside ``span(name)``."""
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def instant(name, **args):
+    """Record a point event."""
+    if _enabled:
+        _events.append(("i", name, perf_counter_ns(), 0, _thread_id(), args))
+
+
+def count(name, n=1):
+    """Add ``n`` to counter ``name``; its rate is traced once per interval."""
+    if not _enabled:
+        return
+    now = perf_counter_ns()
+    with _lock:
+        total = _counters.get(name, 0) + n
+        _counters[name] = total
+        last = _rate_marks.get(name)
+        if last is None:
+            _rate_marks[name] = (now, total - n)
+        elif now - last[0] >= RATE_INTERVAL_NS:
+            rate = (total - last[1]) * 1e9 / (now - last[0])
+            _rate_marks[name] = (now, total)
+            _events.append(("C", name, now, 0, 0, {"per_s": rate}))
+
+
+# -------------------- EXPORT --------------------
+def counters():
+    """Snapshot of all counter totals."""
+    with _lock:
+        return dict(_counters)
+
+
+def summary():
+    """``{span name: {count, total_ms, p50_ms, p99_ms, max_ms}}`` over all spans."""
+    durations = defaultdict(list)
+    for phase, name, _, dur, _, _ in list(_events):
+        if phase == "X":
+            durations[name].append(dur / 1e6)
+    stats = {}
+    for name, ms in sorted(durations.items()):
+        ms = np.asarray(ms)
+        stats[name] = {
+            "count": len(ms),
+            "total_ms": float(ms.sum()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+    return stats
+
+
+def print_summary():
+    print("---- instrumentation ----")
+    for name, s in summary().items():
+        print(
+            f"{name:>32}  n={s['count']:<7} p50={s['p50_ms']:8.3f} ms  "
+            f"p99={s['p99_ms']:8.3f} ms  max={s['max_ms']:8.3f} ms"
+        )
+    for name, total in sorted(counters().items()):
+        print(f"{name:>32}  {total}")
+
+
+def export_chrome_trace(filename):
+    """Write everything recorded so far in Chrome's trace event format."""
+    events = list(_events)
+    origin = min((e[2] for e in events), default=0)
+    trace = [
+        {"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": n}}
+        for tid, n in _thread_names.items()
+    ]
+    for phase, name, ts, dur, tid, args in events:
+        event = {
+            "ph": phase,
+            "name": name,
+            "ts": (ts - origin) / 1e3,  # µs
+            "pid": 1,
+            "tid": tid,
+            "args": args,
+        }
+        if phase == "X":
+            event["dur"] = dur / 1e3
+        elif phase == "i":
+            event["s"] = "t"  # thread-scoped instant
+        trace.append(event)
+    end = max((e[2] - origin for e in events), default=0) / 1e3
+    trace.extend(
+        {"ph": "C", "name": f"{name} (total)", "ts": end, "pid": 1, "args": {"n": v}}
+        for name, v in counters().items()
+    )
+
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+    print(f"Wrote trace with {len(events)} events to {filename}")
@@ -0,0 +1,382 @@
+"""Append-only journal of the session's jumps (incremental autosave).
+
+The journal starts with a reference to the session file the jumps were
+imported from; imported jumps are never copied into it. From then on only
+events are appended: every accepted jump as one record the moment the
+detector keeps it, a tombstone per deletion and a small update per feedback
+shown. Each record is fsynced, so a crash loses nothing, and saving costs
+the same at jump 1000 as at jump 1::
+
+    journal = JumpJournal("May5/Zhengyu.jcs.journal")
+    journal.start(imported_jumps, "May5/Zengwhen4.pkl")  # one small record
+    journal.register(jump)  # once accepted, before it is shown
+    journal.add(jump) / journal.remove(jump) / journal.update_feedback(jump)
+    jumps = journal.load(load_jumps)  # after a crash: input file + events
+
+Every journaled jump carries a ``journal_id`` attribute: imported jumps
+their index in the input file, new ones the next free number.
+
+Garbage (deleted new jumps, superseded feedback) is dropped by rewriting the
+live records into a new file once it outweighs them (``compact``).
+
+Record layout (little endian)::
+
+    b"JJRN" | uint8 kind | 3 pad | uint32 jump id | uint32 length | uint32 crc32
+    | payload
+
+``BASE`` payloads are JSON ``{"session", "n_jumps"}`` (the input file, or
+null); ``ADD`` payloads are ``uint32 meta length | meta JSON | raw windows``
+(the six (N, 4) float64 arrays of ``session_io.SIGNALS``, shapes in the
+meta); ``FEEDBACK`` payloads are JSON; ``REMOVE`` has none. A torn or
+corrupt tail is dropped when the journal is opened.
+"""
+
+import json
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from jump_detection import rebuild_jumps
+from session_io import SIGNALS
+
+ADD, REMOVE, FEEDBACK, BASE = 1, 2, 3, 4
+JOURNAL_MAGIC = b"JJRN"
+# Compact once garbage exceeds the live records and this many bytes
+COMPACT_MIN_BYTES = 4 * 1024 * 1024
+
+_RECORD = struct.Struct("<4sB3xIII")  # magic, kind, id, length, crc32
+_LENGTH = struct.Struct("<I")
+
+
+def _encode(kind, jump_id, payload=b""):
+    prefix = _RECORD.pack(JOURNAL_MAGIC, kind, jump_id, len(payload), 0)[:-4]
+    crc = zlib.crc32(payload, zlib.crc32(prefix))
+    return prefix + _LENGTH.pack(crc) + payload
+
+
+def _json_value(value):
+    if isinstance(value, dict):
+        return {k: _json_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+
+def journal_id(jump):
+    """The journal id of ``jump``, None if it was never journaled.
+
+    Read from the instance dict: a LazyJump must not be built just for this."""
+    return vars(jump).get("journal_id")
+
+
+def encode_jump(jump):
+    """ADD payload: metadata JSON plus the raw windows."""
+    windows = jump.raw_windows()
+    arrays = [np.ascontiguousarray(windows[s], dtype="<f8") for s in SIGNALS]
+    meta = json.dumps(
+        {
+            "detected_time": float(jump.detected_time),
+            "partition": _json_value(jump.partition),
+            "metrics": _json_value(jump.metrics),
+            "feedback": getattr(jump, "feedback", None),
+            "feedback_metrics": _json_value(getattr(jump, "feedback_metrics", [])),
+            "rows": [a.shape[0] for a in arrays],
+        }
+    ).encode("utf-8")
+    return b"".join([_LENGTH.pack(len(meta)), meta] + [a.tobytes() for a in arrays])
+
+
+def decode_jump(payload):
+    """``(Jump keyword args, meta)`` of an ADD payload."""
+    (length,) = _LENGTH.unpack_from(payload)
+    meta = json.loads(payload[4 : 4 + length].decode("utf-8"))
+    record, pos = {}, 4 + length
+    for signal, rows in zip(SIGNALS, meta["rows"]):
+        nbytes = rows * 4 * 8
+        record[signal] = np.frombuffer(payload[pos : pos + nbytes], dtype="<f8")
+        record[signal] = record[signal].reshape(rows, 4).copy()
+        pos += nbytes
+    partition = meta["partition"]
+    record["detected_time"] = meta["detected_time"]
+    record["partition"] = tuple(partition) if partition else None
+    return record, meta
+
+
+class JumpJournal:
+    """Journal file of one session (see module docstring). Thread-safe."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._file = None
+        self._clear()
+
+    def _clear(self):
+        self.base = {"session": None, "n_jumps": 0}  # where imported jumps live
+        self._base_span = None
+        self._next_id = 0
+        self._live = {}  # journal id -> [add (offset, size), feedback (offset, size)]
+        self._tombstones = {}  # removed imported jump id -> REMOVE (offset, size)
+        self._unwritten = set()  # registered ids whose ADD is not written yet
+        self._dropped = set()  # ids removed before their ADD was written
+        self._feedback = {}  # journal id -> last journaled (text, metrics)
+        self._end = 0  # end of the last intact record
+        self._garbage = 0  # bytes of removed jumps / superseded feedback
+        self._pending = {}  # journal id -> ADD payload read by load()
+
+    @property
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def _is_imported(self, jump_id):
+        return jump_id < self.base["n_jumps"]
+
+    # ---------------------- read ----------------------
+    def _scan(self):
+        with open(self.filename, "rb") as f:
+            blob = f.read()
+        self._clear()
+        pos = 0
+        while pos + _RECORD.size <= len(blob):
+            magic, kind, jump_id, length, crc = _RECORD.unpack_from(blob, pos)
+            end = pos + _RECORD.size + length
+            payload = blob[pos + _RECORD.size : end]
+            if (
+                magic != JOURNAL_MAGIC
+                or end > len(blob)
+                or zlib.crc32(payload, zlib.crc32(blob[pos : pos + _RECORD.size - 4]))
+                != crc
+            ):
+                break  # torn or corrupt tail: everything after it is lost
+            span = (pos, end - pos)
+            if kind == BASE:
+                self.base = json.loads(payload.decode("utf-8"))
+                self._base_span = span
+                self._live = {i: [None, None] for i in range(self.base["n_jumps"])}
+                pos = end
+                continue
+            if kind == ADD:
+                self._pending[jump_id] = payload
+                self._live[jump_id] = [span, None]
+            elif kind == REMOVE and jump_id in self._live:
+                self._drop(jump_id, span)
+            elif kind == FEEDBACK and jump_id in self._live:
+                self._set_feedback(jump_id, span, json.loads(payload.decode("utf-8")))
+            self._next_id = max(self._next_id, jump_id + 1)
+            pos = end
+        if pos < len(blob):
+            print(f"⚠️  Dropping {len(blob) - pos} damaged bytes of {self.filename}")
+        self._end = pos
+        self._next_id = max(self._next_id, self.base["n_jumps"])
+
+    def load(self, open_session, workers=None, progress=None):
+        """Rebuild the session recorded in the journal (empty if there is none).
+
+        ``open_session(filename)`` returns the jumps of the input file; the
+        journaled deletions, feedback and new jumps are replayed on top."""
+        if not self.exists:
+            return []
+        with self._lock:
+            self._scan()
+        imported = []
+        if self.base["session"]:
+            try:
+                imported = open_session(self.base["session"])
+            except (OSError, ValueError) as e:
+                print(f"❌ Could not reopen {self.base['session']}: {e}")
+            if len(imported) != self.base["n_jumps"]:
+                print(
+                    f"⚠️  {self.base['session']} now has {len(imported)} jumps, "
+                    f"the journal expected {self.base['n_jumps']}"
+                )
+
+        records, metas = [], {}
+        for jump_id, payload in self._pending.items():
+            record, metas[jump_id] = decode_jump(payload)
+            records.append(record)
+        added = dict(zip(self._pending, rebuild_jumps(records, workers, progress)))
+
+        jumps = []
+        for jump_id in self._live:  # dicts keep journal order
+            if jump_id in added:
+                jump, meta = added[jump_id], metas[jump_id]
+                jump.feedback = meta["feedback"]
+                jump.feedback_metrics = meta["feedback_metrics"]
+            elif jump_id < len(imported):
+                jump = imported[jump_id]
+            else:
+                continue
+            if jump_id in self._feedback:
+                jump.feedback, jump.feedback_metrics = self._feedback[jump_id]
+            else:
+                self._feedback[jump_id] = (jump.feedback, jump.feedback_metrics)
+            jump.journal_id = jump_id
+            jumps.append(jump)
+        self._pending = {}
+        return jumps
+
+    # ---------------------- write ----------------------
+    def _append(self, kind, jump_id, payload=b""):
+        """Write and fsync one record; returns its (offset, size)."""
+        record = _encode(kind, jump_id, payload)
+        if self._file is None:
+            self._file = open(self.filename, "ab")
+            self._file.truncate(self._end)  # drop a torn tail before appending
+        self._file.write(record)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        span = (self._end, len(record))
+        self._end += len(record)
+        return span
+
+    def register(self, jump):
+        """Give a newly accepted jump its journal id (call before it is shown).
+
+        Writing it can wait (``add``): a deletion in between is remembered."""
+        with self._lock:
+            if journal_id(jump) is None:
+                jump.journal_id = self._next_id
+                self._next_id += 1
+                self._unwritten.add(jump.journal_id)
+
+    def add(self, jump):
+        """Journal a newly accepted jump: one record, O(1) in session length."""
+        self.register(jump)
+        with self._lock:
+            jump_id = journal_id(jump)
+            if jump_id not in self._unwritten:
+                return  # already journaled
+            self._unwritten.discard(jump_id)
+            if jump_id in self._dropped:
+                self._dropped.discard(jump_id)
+                return  # deleted before it was written
+            span = self._append(ADD, jump_id, encode_jump(jump))
+            self._live[jump_id] = [span, None]
+
+    def remove(self, jump):
+        """Journal the deletion of ``jump`` (a tombstone)."""
+        with self._lock:
+            jump_id = journal_id(jump)
+            if jump_id in self._unwritten:
+                self._dropped.add(jump_id)  # add() will skip it
+                return
+            if jump_id not in self._live:
+                return
+            self._drop(jump_id, self._append(REMOVE, jump_id))
+            self._maybe_compact()
+
+    def _drop(self, jump_id, span):
+        """Account for the REMOVE record ``span`` of a live jump."""
+        add, feedback = self._live.pop(jump_id)
+        self._feedback.pop(jump_id, None)
+        self._pending.pop(jump_id, None)
+        self._garbage += feedback[1] if feedback else 0
+        if self._is_imported(jump_id):
+            self._tombstones[jump_id] = span  # needed to replay the input file
+        else:
+            self._garbage += add[1] + span[1]
+
+    def update_feedback(self, jump):
+        """Journal the feedback last shown for ``jump`` if it changed."""
+        text = getattr(jump, "feedback", None)
+        metrics = _json_value(list(getattr(jump, "feedback_metrics", None) or []))
+        with self._lock:
+            jump_id = journal_id(jump)
+            unchanged = self._feedback.get(jump_id) == (text, metrics)
+            if jump_id not in self._live or unchanged:
+                return  # not journaled yet (its ADD will carry it) or unchanged
+            payload = json.dumps({"feedback": text, "feedback_metrics": metrics})
+            span = self._append(FEEDBACK, jump_id, payload.encode("utf-8"))
+            self._set_feedback(
+                jump_id, span, {"feedback": text, "feedback_metrics": metrics}
+            )
+            self._maybe_compact()
+
+    def _set_feedback(self, jump_id, span, feedback):
+        previous = self._live[jump_id][1]
+        self._garbage += previous[1] if previous else 0
+        self._live[jump_id][1] = span
+        self._feedback[jump_id] = (feedback["feedback"], feedback["feedback_metrics"])
+
+    # ---------------------- compaction ----------------------
+    def _live_bytes(self):
+        spans = [self._base_span] + list(self._tombstones.values())
+        spans += [s for pair in self._live.values() for s in pair]
+        return sum(s[1] for s in spans if s)
+
+    def _maybe_compact(self):
+        if self._garbage > max(COMPACT_MIN_BYTES, self._live_bytes()):
+            self._compact()
+
+    def compact(self):
+        """Rewrite the journal with only its live records."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        self.close()
+        tmp_filename = self.filename + ".tmp"
+        offset = 0
+
+        def copy(span):
+            nonlocal offset
+            if span is None:
+                return None
+            src.seek(span[0])
+            dst.write(src.read(span[1]))
+            offset += span[1]
+            return (offset - span[1], span[1])
+
+        with open(self.filename, "rb") as src, open(tmp_filename, "wb") as dst:
+            base_span = copy(self._base_span)
+            tombstones = {i: copy(s) for i, s in self._tombstones.items()}
+            live = {i: [copy(s) for s in pair] for i, pair in self._live.items()}
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_filename, self.filename)
+        self._base_span, self._tombstones, self._live = base_span, tombstones, live
+        self._end, self._garbage = offset, 0
+
+    def start(self, jumps, session_filename):
+        """Start the journal over from the jumps imported from ``session_filename``.
+
+        Only a reference to the file is written, not the jumps themselves."""
+        with self._lock:
+            self.close()
+            self._clear()
+            if session_filename is not None:
+                session_filename = os.path.abspath(session_filename)
+            self.base = {"session": session_filename, "n_jumps": len(jumps)}
+            record = _encode(BASE, 0, json.dumps(self.base).encode("utf-8"))
+            tmp_filename = self.filename + ".tmp"
+            with open(tmp_filename, "wb") as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_filename, self.filename)
+            self._base_span = (0, len(record))
+            self._end, self._next_id = len(record), len(jumps)
+            for jump_id, jump in enumerate(jumps):
+                jump.journal_id = jump_id
+                self._live[jump_id] = [None, None]
+                self._feedback[jump_id] = (
+                    getattr(jump, "feedback", None),
+                    _json_value(list(getattr(jump, "feedback_metrics", None) or [])),
+                )
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Delete the journal, e.g. once the session was exported."""
+        with self._lock:
+            self.close()
+            if self.exists:
+                os.remove(self.filename)
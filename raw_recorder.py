@@ -0,0 +1,247 @@
+"""Append-only log of every raw sample, for recovering crashed sessions.
+
+``RawRecorder`` attaches a chunk sink to each ring buffer in ``data``. Every
+``BATCH_S`` seconds the sink queues a copied block of rows (one modulo per
+sample on the IMU callback thread, nothing else). A writer thread drains the
+queue and writes every pending block in one write. It flushes after each
+write and fsyncs at least every ``FSYNC_S``. A killed process loses at most
+the last batch::
+
+    recorder = RawRecorder("May5/raw_log", DEVICE_INFO)
+    recorder.attach(data)  # once the IMU threads created their buffers
+    ...
+    recorder.close()
+
+Segments (``raw-000000.jcl``, ...) roll over at ``SEGMENT_BYTES``::
+
+    b"JCRAWLOG" | uint32 header length | header JSON
+    records: b"JREC" | uint16 stream | uint16 0 | uint32 rows | uint32 crc32
+             | rows x 4 float64 (timestamp, x, y, z; accel in g)
+
+The header lists the streams as ``[address, device name, sensor]``; the CRC
+covers the record header and payload. ``read_log`` skips damaged records and
+resynchronizes on the next record marker. recover_session.py rebuilds a
+session from a log.
+
+SampleHistory (the app's default store) already keeps every sample on disk;
+enable this log instead of it when a crash may lose at most ``BATCH_S``.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+from time import monotonic
+
+import numpy as np
+
+from ring_buffer import SAMPLE_RATE_HZ
+
+LOG_MAGIC = b"JCRAWLOG"
+LOG_VERSION = 1
+SEGMENT_PREFIX = "raw-"
+SEGMENT_EXTENSION = ".jcl"
+SENSORS = ("accel", "gyro")
+
+BATCH_S = 0.5  # samples per block handed to the writer [s]
+FSYNC_S = 5.0  # longest time written data may sit in the OS cache [s]
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+_RECORD_MAGIC = b"JREC"
+_RECORD = struct.Struct("<4sHHII")  # magic, stream, reserved, rows, crc32
+_LENGTH = struct.Struct("<I")
+_WIDTH = 4
+
+
+def segment_filename(directory, number):
+    return os.path.join(directory, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_EXTENSION}")
+
+
+def list_segments(directory):
+    """Segment files of a log directory, oldest first."""
+    names = [
+        n
+        for n in os.listdir(directory)
+        if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_EXTENSION)
+    ]
+    return [os.path.join(directory, n) for n in sorted(names)]
+
+
+def encode_record(stream, rows):
+    payload = np.ascontiguousarray(rows, dtype="<f8").tobytes()
+    prefix = _RECORD.pack(_RECORD_MAGIC, stream, 0, len(rows), 0)[:12]
+    crc = zlib.crc32(payload, zlib.crc32(prefix))
+    return prefix + _LENGTH.pack(crc) + payload
+
+
+# -------------------- WRITE --------------------
+class RawRecorder:
+    """Background writer of the raw sample log (see module docstring)."""
+
+    def __init__(
+        self,
+        directory,
+        device_info,
+        batch_s=BATCH_S,
+        rate_hz=SAMPLE_RATE_HZ,
+        segment_bytes=SEGMENT_BYTES,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.batch_rows = max(1, int(round(batch_s * rate_hz)))
+        self.segment_bytes = segment_bytes
+        self.streams = [
+            (address, name, sensor)
+            for address, name in device_info.items()
+            for sensor in SENSORS
+        ]
+        self.stream_ids = {(a, s): i for i, (a, _, s) in enumerate(self.streams)}
+        existing = list_segments(directory)  # a new run never touches old segments
+        self._next_segment = (
+            int(os.path.basename(existing[-1])[len(SEGMENT_PREFIX) :].split(".")[0]) + 1
+            if existing
+            else 0
+        )
+        self._file = None
+        self._last_fsync = monotonic()
+        self._sinks = {}  # (address, sensor) -> (RingBuffer, sink)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="RawRecorder", daemon=True
+        )
+        self._writer.start()
+
+    def attach(self, data):
+        """Record every device of ``device_info`` already present in ``data``."""
+        for (address, sensor), stream in self.stream_ids.items():
+            if (address, sensor) in self._sinks or address not in data:
+                continue
+            buffer = data[address][sensor]
+            put = self._queue.put
+
+            def sink(rows, stream=stream):
+                put((stream, rows))
+
+            buffer.add_sink(sink, self.batch_rows)
+            self._sinks[(address, sensor)] = (buffer, sink)
+
+    # ---------------------- writer thread ----------------------
+    def _write_loop(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while True:  # everything that queued up goes out in one write
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if batch:
+                try:
+                    self._write(b"".join(encode_record(s, r) for s, r in batch))
+                except OSError as e:
+                    print(f"❌ Raw recorder write failed: {e}")
+        self._close_segment()
+
+    def _write(self, blob):
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            self._close_segment()
+            self._open_segment()
+        self._file.write(blob)
+        self._file.flush()
+        if monotonic() - self._last_fsync >= FSYNC_S:
+            os.fsync(self._file.fileno())
+            self._last_fsync = monotonic()
+
+    def _open_segment(self):
+        header = json.dumps(
+            {
+                "version": LOG_VERSION,
+                "segment": self._next_segment,
+                "streams": [list(s) for s in self.streams],
+            }
+        ).encode("utf-8")
+        self._file = open(segment_filename(self.directory, self._next_segment), "wb")
+        self._file.write(LOG_MAGIC + _LENGTH.pack(len(header)) + header)
+        self._next_segment += 1
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Write the unfinished batches and stop. Call after the IMU threads stopped."""
+        for buffer, sink in self._sinks.values():
+            buffer.remove_sink(sink)
+        self._sinks.clear()
+        self._queue.put(None)
+        self._writer.join()
+
+
+# -------------------- READ --------------------
+def read_segment(filename):
+    """Return ``(streams, {stream id: [rows, ...]}, damaged bytes)`` of one segment."""
+    with open(filename, "rb") as f:
+        blob = f.read()
+    if not blob.startswith(LOG_MAGIC):
+        raise ValueError(f"{filename} is not a JumpCoach raw log segment")
+    start = len(LOG_MAGIC)
+    (length,) = _LENGTH.unpack_from(blob, start)
+    header = json.loads(blob[start + 4 : start + 4 + length].decode("utf-8"))
+    if header["version"] > LOG_VERSION:
+        raise ValueError(f"{filename} uses raw log v{header['version']}")
+
+    blocks, damaged = {}, 0
+    pos = start + 4 + length
+    while pos + _RECORD.size <= len(blob):
+        magic, stream, _, rows, crc = _RECORD.unpack_from(blob, pos)
+        end = pos + _RECORD.size + rows * _WIDTH * 8
+        payload = blob[pos + _RECORD.size : end]
+        if (
+            magic == _RECORD_MAGIC
+            and end <= len(blob)
+            and stream < len(header["streams"])
+            and zlib.crc32(payload, zlib.crc32(blob[pos : pos + 12])) == crc
+        ):
+            rows = np.frombuffer(payload, dtype="<f8").reshape(rows, _WIDTH)
+            blocks.setdefault(stream, []).append(rows)
+            pos = end
+            continue
+        # Damaged or torn record: resume at the next record marker
+        resume = blob.find(_RECORD_MAGIC, pos + 1)
+        resume = len(blob) if resume < 0 else resume
+        damaged += resume - pos
+        pos = resume
+    damaged += len(blob) - pos  # torn tail shorter than a record header
+    return header["streams"], blocks, damaged
+
+
+def read_log(directory):
+    """Reassemble a raw log.
+
+    Returns ``(device_info, {(address, sensor): (N, 4) rows}, report)``; the
+    report counts segments, records and damaged bytes."""
+    device_info, parts = {}, {}
+    report = {"segments": 0, "records": 0, "damaged_bytes": 0}
+    for filename in list_segments(directory):
+        try:
+            streams, blocks, damaged = read_segment(filename)
+        except (ValueError, OSError, struct.error) as e:
+            print(f"⚠️  Skipping {filename}: {e}")
+            continue
+        report["segments"] += 1
+        report["damaged_bytes"] += damaged
+        for stream, rows in blocks.items():
+            address, name, sensor = streams[stream]
+            device_info[address] = name
+            parts.setdefault((address, sensor), []).extend(rows)
+            report["records"] += len(rows)
+    samples = {key: np.concatenate(rows) for key, rows in parts.items()}
+    return device_info, samples, report
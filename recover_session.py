@@ -0,0 +1,127 @@
+"""Rebuild a session from its on-disk samples after a crash.
+
+Reads every intact record of a sample history (sample_history, the app's
+default) or raw log (raw_recorder), runs the live jump detector over the
+recovered lower-back accelerometer stream and captures each jump from the
+recovered buffers exactly like the app would, then saves the jumps::
+
+    python recover_session.py May5/Zhengyu_history -o May5/recovered.jcs
+
+Either directory can also be replayed through the simulated devices
+(``SIMULATE = "May5/Zhengyu_history"`` in app.py). Imports no PyQt.
+"""
+
+import argparse
+import sys
+
+from jump_detection import (
+    POST_TRIGGER_S,
+    PRE_TRIGGER_S,
+    PendingCapture,
+    StreamingJumpDetector,
+    capture_jump,
+    recompute_pb_flags,
+)
+import numpy as np
+
+from raw_recorder import SENSORS, read_log
+from ring_buffer import RingBuffer
+from sample_history import is_history, read_history
+from session_io import save_session
+
+
+def read_samples(directory):
+    """``(device_info, {(address, sensor): rows}, report)`` of a history or raw log."""
+    if is_history(directory):
+        return read_history(directory)
+    return read_log(directory)
+
+
+def read_recording(directory):
+    """Samples of a directory as an IMU_simulator recording ``{name: {sensor: rows}}``."""
+    device_info, samples, _ = read_samples(directory)
+    return {
+        name: {
+            sensor: samples.get((address, sensor), np.empty((0, 4)))
+            for sensor in SENSORS
+        }
+        for address, name in device_info.items()
+    }
+
+
+def buffers_from_samples(device_info, samples):
+    """``data`` dict of ring buffers each holding one whole recovered stream."""
+    data = {}
+    for address in device_info:
+        data[address] = {}
+        for sensor in SENSORS:
+            rows = samples.get((address, sensor))
+            buffer = RingBuffer(max(1, 0 if rows is None else len(rows)))
+            if rows is not None:
+                buffer.extend(rows)
+            data[address][sensor] = buffer
+    return data
+
+
+def detect_jumps(device_info, data):
+    """Jumps found in recovered buffers, in order (faulty captures dropped)."""
+    trigger_address = next(
+        address for address, name in device_info.items() if name == "Lower Back"
+    )
+    triggers = StreamingJumpDetector().scan(data[trigger_address]["accel"])
+    jumps = []
+    for trigger in triggers:
+        capture = PendingCapture(
+            trigger,
+            trigger.timestamp - PRE_TRIGGER_S,
+            trigger.timestamp + POST_TRIGGER_S,
+        )
+        jump = capture_jump(data, device_info, capture)
+        if jump is None or jump.metrics is None:
+            print(f"⚠️  Faulty jump at {trigger.timestamp:.3f} (no valid metrics)")
+            continue
+        jumps.append(jump)
+    recompute_pb_flags(jumps)
+    return jumps
+
+
+def recover(directory):
+    """``(jumps, report)`` rebuilt from the history or raw log in ``directory``."""
+    device_info, samples, report = read_samples(directory)
+    if sorted(device_info.values()) != sorted(["Lower Back", "Thigh", "Wrist"]):
+        raise ValueError(f"log has devices {sorted(device_info.values())}")
+    data = buffers_from_samples(device_info, samples)
+    report["samples"] = {
+        f"{device_info[address]} {sensor}": len(rows)
+        for (address, sensor), rows in samples.items()
+    }
+    return detect_jumps(device_info, data), report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "directory", help="sample history (*.chunks) or raw log (raw-*.jcl) directory"
+    )
+    parser.add_argument(
+        "-o", "--output", default="recovered.jcs", help="session file to write"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        jumps, report = recover(args.directory)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot recover {args.directory}: {e}")
+
+    print(
+        f"Read {report['records']} records from {report['segments']} segments "
+        f"({report['damaged_bytes']} damaged bytes skipped)"
+    )
+    for stream, n in sorted(report["samples"].items()):
+        print(f"{stream:>18}: {n} samples")
+    save_session(jumps, args.output)
+    print(f"Recovered {len(jumps)} jumps to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
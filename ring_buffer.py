@@ -0,0 +1,158 @@
+import numpy as np
+import threading
+
+# Default sensor rate configured in IMU_manager (accel + gyro @ 100 Hz)
+SAMPLE_RATE_HZ = 100
+
+# Extra rows kept past `capacity` so a reader holding a full-length view is not
+# overwritten by the next few callbacks while it works on it.
+_SLACK = 64
+
+
+class RingBuffer:
+    """Fixed-capacity store of ``[timestamp, x, y, z]`` sensor rows.
+
+    Appends are O(1) and never reallocate. Every row is written twice (at ``i``
+    and ``i + size``) so the most recent ``capacity`` samples are always one
+    contiguous, zero-copy NumPy view. Views alias the buffer: copy them if they
+    must outlive the retention horizon.
+
+    Sinks (``add_sink``) receive every ``chunk_rows`` consecutive rows as one
+    copied block, e.g. to spill history to disk before it is overwritten."""
+
+    def __init__(self, capacity, width=4):
+        self.capacity = int(capacity)
+        self.width = width
+        self._size = self.capacity + _SLACK
+        self._buf = np.zeros((2 * self._size, width), dtype=float)
+        self._count = 0  # total rows ever appended (monotonic)
+        self._new_data = threading.Event()
+        self._sinks = []  # [sink, chunk_rows, total at attach]
+
+    @classmethod
+    def for_horizon(cls, seconds, rate_hz=SAMPLE_RATE_HZ, width=4):
+        """Buffer sized to retain the last ``seconds`` of data at ``rate_hz``."""
+        return cls(int(np.ceil(seconds * rate_hz)), width)
+
+    # ---------------------- writer side ----------------------
+    def append(self, row):
+        i = self._count % self._size
+        self._buf[i] = row
+        self._buf[i + self._size] = row
+        self._count += 1  # publish only once both copies are written
+        self._new_data.set()
+        for sink, chunk_rows, start in self._sinks:
+            if (self._count - start) % chunk_rows == 0:
+                sink(self.view(chunk_rows).copy())
+
+    def extend(self, rows):
+        """Append many rows at once, e.g. to load a recording for offline use."""
+        rows = np.asarray(rows, dtype=float).reshape(-1, self.width)
+        if self._sinks:  # keep sink blocks exact
+            for row in rows:
+                self.append(row)
+            return
+        while len(rows):
+            i = self._count % self._size
+            n = min(len(rows), self._size - i)
+            self._buf[i : i + n] = rows[:n]
+            self._buf[i + self._size : i + self._size + n] = rows[:n]
+            self._count += n
+            rows = rows[n:]
+        self._new_data.set()
+
+    def add_sink(self, sink, chunk_rows):
+        """Call ``sink(rows)`` with each block of ``chunk_rows`` new rows.
+
+        Runs on the writer thread, so sinks should only hand the block off."""
+        if not 0 < chunk_rows <= self.capacity:
+            raise ValueError(f"chunk_rows must be in 1..{self.capacity}")
+        self._sinks.append([sink, int(chunk_rows), self._count])
+
+    def remove_sink(self, sink, flush=True):
+        """Detach ``sink``, first handing it the rows of an unfinished block.
+
+        Call once the writer has stopped."""
+        for entry in self._sinks:
+            if entry[0] is sink:
+                self._sinks.remove(entry)
+                pending = (self._count - entry[2]) % entry[1]
+                if flush and pending:
+                    sink(self.view(pending).copy())
+                return
+
+    def wait_for_data(self, timeout=None):
+        """Block until rows were appended since the last wait; True if any were.
+
+        Meant for a single consumer thread (the jump detector)."""
+        arrived = self._new_data.wait(timeout)
+        self._new_data.clear()
+        return arrived
+
+    # ---------------------- reader side ----------------------
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def total(self):
+        """Number of rows appended since creation (including evicted ones)."""
+        return self._count
+
+    def view(self, n=None):
+        """Zero-copy view of the newest ``n`` rows (all retained rows by default)."""
+        return self._rows(self._count, n)
+
+    def view_since(self, cursor):
+        """``(rows, total)``: rows appended at absolute index >= ``cursor``.
+
+        Both come from one snapshot of the row count, so rows appended
+        meanwhile cannot shift the view against ``total``. Rows already
+        evicted are missing; the first returned row is ``total - len(rows)``."""
+        count = self._count
+        return self._rows(count, count - cursor), count
+
+    def _rows(self, count, n):
+        available = min(count, self.capacity)
+        n = available if n is None else max(0, min(int(n), available))
+        end = count % self._size + self._size
+        return self._buf[end - n : end]
+
+    def newest_time(self):
+        """Timestamp of the most recent row, or None while empty."""
+        if self._count == 0:
+            return None
+        return self._buf[(self._count - 1) % self._size, 0]
+
+    def last_seconds(self, seconds, now=None):
+        """Rows with timestamp >= ``now - seconds`` (``now`` defaults to the newest row)."""
+        data = self.view()
+        if data.shape[0] == 0:
+            return data
+        ref = data[-1, 0] if now is None else now
+        start = np.searchsorted(data[:, 0], ref - seconds, side="left")
+        return data[start:]
+
+    def window(self, start_time, end_time):
+        """Zero-copy view of rows with ``start_time <= t <= end_time``.
+
+        Timestamps are monotonic, so this is two binary searches: the cost
+        depends on the window, not on how much history is retained."""
+        data = self.view()
+        ts = data[:, 0]
+        lo = np.searchsorted(ts, start_time, side="left")
+        hi = np.searchsorted(ts, end_time, side="right")
+        return data[lo:hi]
+
+
+def extract_windows(data, device_info, start_time, end_time):
+    """Return ``{device_name: {"accel": view, "gyro": view}}`` for one time range.
+
+    ``data`` is the shared ``{address: {"accel": RingBuffer, "gyro": RingBuffer}}``
+    dict filled by the IMU threads. The views are zero-copy; copy before keeping."""
+    return {
+        name: {
+            sensor: buffer.window(start_time, end_time)
+            for sensor, buffer in data[address].items()
+        }
+        for address, name in device_info.items()
+    }
@@ -0,0 +1,337 @@
+"""Tiered raw sample history: recent samples in RAM, older ones on disk.
+
+The hot tier is the ring buffers in ``data`` (``RETENTION_SECONDS`` per
+sensor, enough for detection and the live plots). ``SampleHistory`` adds a
+chunk sink to every buffer: each ``CHUNK_S`` seconds of samples is handed
+to a writer thread, compressed and appended to one file per device and
+sensor, so memory stays fixed however long the session runs::
+
+    history = SampleHistory("May5/history", DEVICE_INFO)
+    history.attach(data)  # once the IMU threads created their buffers
+    ...
+    history.window(address, "accel", t0, t1)  # any time range, hot or cold
+    history.close()  # spill what is still only in RAM
+
+A closed history is reopened with ``SampleHistory(directory)``;
+``stream(address, sensor)`` then returns the complete raw recording.
+Attaching to an existing directory appends to its streams. The history is
+also the session's crash log: every chunk is fsynced and checksummed, and
+recover_session.py rebuilds a session from it (``read_history``). A crash
+loses at most the last ``CHUNK_S`` seconds.
+
+Chunk files are a sequence of ``header | payload`` records. The header is
+``b"JCK2" | uint32 rows | float64 t0 | float64 t1 | uint32 payload bytes
+| uint32 crc32`` (little endian; the CRC covers the rest of the header and
+the payload), the payload the zlib-compressed, byte-shuffled (N, 4) float64
+rows. A record cut short by a crash is dropped on reopening, a damaged one
+is skipped when read. ``devices.json`` maps addresses to device names.
+"""
+
+import bisect
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from ring_buffer import SAMPLE_RATE_HZ
+
+# Seconds of samples per compressed chunk (must fit in the hot ring buffer)
+CHUNK_S = 10.0
+COMPRESSION_LEVEL = 1  # zlib: fast, the writer must keep up at any speed
+CHUNK_EXTENSION = ".chunks"
+DEVICES_FILENAME = "devices.json"
+
+_CHUNK_MAGIC = b"JCK2"
+_CHUNK_HEADER = struct.Struct("<4sIddII")  # magic, rows, t0, t1, bytes, crc32
+_LEGACY_MAGIC = b"JCHK"  # chunks written before the CRC: no checksum
+_LEGACY_HEADER = struct.Struct("<4sIddI")
+_WIDTH = 4
+
+
+# -------------------- CHUNK CODEC --------------------
+def compress_rows(rows):
+    """zlib payload of (N, 4) rows, stored as byte planes (compresses better)."""
+    rows = np.ascontiguousarray(rows, dtype="<f8")
+    planes = rows.view(np.uint8).reshape(-1, 8).T
+    return zlib.compress(planes.tobytes(), COMPRESSION_LEVEL)
+
+
+def decompress_rows(payload, n_rows):
+    planes = np.frombuffer(zlib.decompress(payload), dtype=np.uint8).reshape(8, -1)
+    return np.ascontiguousarray(planes.T).view("<f8").reshape(n_rows, _WIDTH)
+
+
+def _chunk_crc(header, payload):
+    return zlib.crc32(payload, zlib.crc32(header[: _CHUNK_HEADER.size - 4]))
+
+
+def stream_filename(directory, address, sensor):
+    return os.path.join(
+        directory, f"{address.replace(':', '-')}_{sensor}{CHUNK_EXTENSION}"
+    )
+
+
+# -------------------- ONE STREAM --------------------
+class ChunkStream:
+    """Append-only file of compressed chunks for one device/sensor.
+
+    An in-memory index of chunk time spans (a few numbers per chunk) makes
+    a time-range query two binary searches plus decompressing only the
+    chunks it overlaps."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._starts, self._ends = [], []
+        self._records = []  # (payload offset, rows, bytes, crc32 or None)
+        self._end_offset = 0
+        self._file = None
+        self.damaged_chunks = self.damaged_bytes = 0  # skipped by read() so far
+        self._lock = threading.Lock()
+        if os.path.exists(filename):
+            self._scan()
+
+    def __len__(self):
+        return sum(record[1] for record in self._records)
+
+    def _scan(self):
+        """Rebuild the index from the file, dropping a torn last record."""
+        size = os.path.getsize(self.filename)
+        offset = 0
+        with open(self.filename, "rb") as f:
+            while offset + _LEGACY_HEADER.size <= size:
+                head = f.read(_CHUNK_HEADER.size)
+                if head[:4] == _CHUNK_MAGIC and len(head) == _CHUNK_HEADER.size:
+                    _, rows, t0, t1, nbytes, crc = _CHUNK_HEADER.unpack(head)
+                    header_size = _CHUNK_HEADER.size
+                elif head[:4] == _LEGACY_MAGIC:
+                    _, rows, t0, t1, nbytes = _LEGACY_HEADER.unpack_from(head)
+                    header_size, crc = _LEGACY_HEADER.size, None
+                else:
+                    break
+                if offset + header_size + nbytes > size:
+                    break
+                self._index(offset + header_size, rows, t0, t1, nbytes, crc)
+                offset += header_size + nbytes
+                f.seek(offset)
+        self._end_offset = offset
+
+    def _index(self, offset, rows, t0, t1, nbytes, crc):
+        self._starts.append(t0)
+        self._ends.append(t1)
+        self._records.append((offset, rows, nbytes, crc))
+
+    def append(self, rows):
+        """Compress, write and fsync one chunk (writer thread)."""
+        if len(rows) == 0:
+            return
+        payload = compress_rows(rows)
+        t0, t1 = float(rows[0, 0]), float(rows[-1, 0])
+        header = _CHUNK_HEADER.pack(_CHUNK_MAGIC, len(rows), t0, t1, len(payload), 0)
+        crc = _chunk_crc(header, payload)
+        if self._file is None:
+            self._file = open(self.filename, "ab")
+            self._file.truncate(self._end_offset)  # drop a torn record
+        self._file.write(header[:-4] + struct.pack("<I", crc))
+        self._file.write(payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        start = self._end_offset + _CHUNK_HEADER.size
+        with self._lock:  # readers only ever see complete chunks
+            self._index(start, len(rows), t0, t1, len(payload), crc)
+        self._end_offset = start + len(payload)
+
+    def read(self, start_time=-np.inf, end_time=np.inf):
+        """Rows with ``start_time <= t <= end_time`` from the chunks on disk."""
+        with self._lock:
+            lo = bisect.bisect_left(self._ends, start_time)
+            hi = bisect.bisect_right(self._starts, end_time)
+            records = self._records[lo:hi]
+        parts = []
+        with open(self.filename, "rb") as f:
+            for offset, rows, nbytes, crc in records:
+                chunk = self._read_chunk(f, offset, rows, nbytes, crc)
+                if chunk is not None:
+                    parts.append(chunk)
+        if not parts:
+            return np.empty((0, _WIDTH))
+        data = np.concatenate(parts)
+        ts = data[:, 0]
+        return data[
+            np.searchsorted(ts, start_time, side="left") : np.searchsorted(
+                ts, end_time, side="right"
+            )
+        ]
+
+    def _read_chunk(self, f, offset, rows, nbytes, crc):
+        """Rows of one chunk, None (and a warning) if it is damaged."""
+        f.seek(offset - (_CHUNK_HEADER.size if crc is not None else 0))
+        header = f.read(_CHUNK_HEADER.size) if crc is not None else b""
+        payload = f.read(nbytes)
+        try:
+            if crc is not None and _chunk_crc(header, payload) != crc:
+                raise ValueError("checksum mismatch")
+            return decompress_rows(payload, rows)
+        except (ValueError, zlib.error) as e:
+            self.damaged_chunks += 1
+            self.damaged_bytes += nbytes
+            print(f"⚠️  Skipping damaged chunk at {offset} of {self.filename}: {e}")
+            return None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# -------------------- SESSION HISTORY --------------------
+class SampleHistory:
+    """Hot ring buffers plus cold on-disk chunks, queried as one timeline."""
+
+    def __init__(
+        self, directory, device_info=None, chunk_s=CHUNK_S, rate_hz=SAMPLE_RATE_HZ
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.device_info = _read_devices(directory)  # address -> device name
+        if device_info and any(
+            self.device_info.get(a) != n for a, n in device_info.items()
+        ):
+            self.device_info.update(device_info)
+            _write_devices(directory, self.device_info)
+        self.chunk_rows = int(round(chunk_s * rate_hz))
+        self.streams = {}  # (address, sensor) -> ChunkStream
+        self.buffers = {}  # (address, sensor) -> RingBuffer (hot tier)
+        self._sinks = {}
+        self._queue = queue.Queue()
+        self._writer = None
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(CHUNK_EXTENSION):
+                stem = name[: -len(CHUNK_EXTENSION)]
+                address, sensor = stem.rsplit("_", 1)
+                self.streams[(address.replace("-", ":"), sensor)] = ChunkStream(
+                    os.path.join(directory, name)
+                )
+
+    def attach(self, data):
+        """Spill every ring buffer of ``data`` (``{address: {sensor: RingBuffer}}``)."""
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._write_loop, name="SampleHistory", daemon=True
+            )
+            self._writer.start()
+        for address, sensors in data.items():
+            for sensor, buffer in sensors.items():
+                key = (address, sensor)
+                if key in self.buffers:
+                    continue
+                if key not in self.streams:
+                    self.streams[key] = ChunkStream(
+                        stream_filename(self.directory, address, sensor)
+                    )
+                sink = self._sink(key)
+                buffer.add_sink(sink, self.chunk_rows)
+                self.buffers[key] = buffer
+                self._sinks[key] = sink
+
+    def _sink(self, key):
+        put = self._queue.put
+        return lambda rows: put((key, rows))  # IMU callback thread: hand off only
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, rows = item
+            try:
+                self.streams[key].append(rows)
+            except OSError as e:
+                print(f"❌ Could not spill {key[0]} {key[1]} history: {e}")
+
+    # ---------------------- queries ----------------------
+    def window(self, address, sensor, start_time, end_time):
+        """Rows with ``start_time <= t <= end_time``, hot and cold tiers merged.
+
+        Rows still in the ring buffer are read from it; older ones come from
+        disk. The result is a copy."""
+        key = (address, sensor)
+        buffer = self.buffers.get(key)
+        hot = buffer.view() if buffer is not None else np.empty((0, _WIDTH))
+        boundary = hot[0, 0] if len(hot) else np.inf  # oldest row still in RAM
+        parts = []
+        stream = self.streams.get(key)
+        if stream is not None and start_time < boundary:
+            cold = stream.read(start_time, end_time)
+            parts.append(cold[cold[:, 0] < boundary])
+        if len(hot) and end_time >= boundary:
+            ts = hot[:, 0]
+            lo = np.searchsorted(ts, start_time, side="left")
+            hi = np.searchsorted(ts, end_time, side="right")
+            parts.append(hot[lo:hi])
+        if not parts:
+            return np.empty((0, _WIDTH))
+        return np.concatenate(parts)
+
+    def stream(self, address, sensor):
+        """Everything recorded for one device/sensor."""
+        return self.window(address, sensor, -np.inf, np.inf)
+
+    def devices(self):
+        return sorted({address for address, _ in self.streams})
+
+    # ---------------------- shutdown ----------------------
+    def close(self):
+        """Write the rows that are only in RAM and stop the writer.
+
+        Call after the IMU threads stopped appending."""
+        for key, buffer in self.buffers.items():
+            buffer.remove_sink(self._sinks[key])
+        self.buffers.clear()
+        self._sinks.clear()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        for stream in self.streams.values():
+            stream.close()
+
+
+def _read_devices(directory):
+    try:
+        with open(os.path.join(directory, DEVICES_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_devices(directory, device_info):
+    tmp_filename = os.path.join(directory, DEVICES_FILENAME + ".tmp")
+    with open(tmp_filename, "w") as f:
+        json.dump(device_info, f)
+    os.replace(tmp_filename, os.path.join(directory, DEVICES_FILENAME))
+
+
+# -------------------- RECOVERY --------------------
+def is_history(directory):
+    return any(n.endswith(CHUNK_EXTENSION) for n in os.listdir(directory))
+
+
+def read_history(directory):
+    """Every intact sample of a history directory, like ``raw_recorder.read_log``.
+
+    Returns ``(device_info, {(address, sensor): (N, 4) rows}, report)``; the
+    report counts stream files (``segments``), intact chunks (``records``)
+    and the compressed bytes of damaged ones."""
+    history = SampleHistory(directory)
+    samples, report = {}, {"segments": 0, "records": 0, "damaged_bytes": 0}
+    for (address, sensor), stream in history.streams.items():
+        samples[(address, sensor)] = stream.read()
+        report["segments"] += 1
+        report["records"] += len(stream._records) - stream.damaged_chunks
+        report["damaged_bytes"] += stream.damaged_bytes
+    history.close()
+    return history.device_info, samples, report
@@ -0,0 +1,325 @@
+"""Columnar binary session files (``.jcs``).
+
+Layout (all little endian)::
+
+    b"JUMPCOACH\\0" | uint32 header length | header JSON (utf-8) | pad to 64
+    data blocks, each 64-byte aligned
+
+The JSON header lists every block as ``{"offset", "dtype", "shape"}`` with the
+offset relative to the start of the data section, so any block can be read
+with ``np.fromfile`` / ``np.memmap`` without unpickling anything:
+
+* ``<signal>`` – raw (N, 4) windows of all jumps concatenated, one block per
+  device/sensor (``lower_back_accel``, ``wrist_gyro``, ...)
+* ``<signal>_offsets`` – (n_jumps + 1,) row boundaries into that block
+* ``detected_time`` (n_jumps,), ``partition`` (n_jumps, 3) and
+  ``metrics`` (n_jumps, n_metrics); NaN marks a missing value
+
+Feedback text and feedback metrics are small and live in the header, as
+does the ``metrics_version`` the stored metrics were computed with.
+"""
+
+import json
+import os
+import pickle
+import struct
+import sys
+
+import numpy as np
+
+from jump_detection import DEVICES, METRICS_VERSION, Jump, rebuild_jumps
+
+SESSION_MAGIC = b"JUMPCOACH\0"
+SESSION_VERSION = 1
+SESSION_EXTENSION = ".jcs"
+SIGNALS = tuple(f"{d}_{s}" for d in DEVICES for s in ("accel", "gyro"))
+
+_ALIGN = 64
+_LENGTH = struct.Struct("<I")
+
+
+def _aligned(n):
+    return -(-n // _ALIGN) * _ALIGN
+
+
+# -------------------- WRITE --------------------
+def save_session(jumps, filename):
+    """Write ``jumps`` to ``filename`` in the columnar session format."""
+    # Windows cannot replace a file that is still memory-mapped: jumps read
+    # from the target move to RAM before it is overwritten
+    for reader in {
+        id(j._reader): j._reader for j in jumps if isinstance(j, LazyJump)
+    }.values():
+        if os.path.exists(filename) and os.path.samefile(reader.filename, filename):
+            reader.release()
+    windows = [j.raw_windows() for j in jumps]
+    metric_names = sorted({k for j in jumps for k in (j.metrics or {})})
+
+    blocks = {}
+    for signal in SIGNALS:
+        parts = [np.asarray(w[signal], dtype="<f8").reshape(-1, 4) for w in windows]
+        blocks[signal] = np.concatenate(parts) if parts else np.empty((0, 4))
+        blocks[f"{signal}_offsets"] = np.concatenate(
+            [[0], np.cumsum([p.shape[0] for p in parts], dtype="<i8")]
+        ).astype("<i8")
+    blocks["detected_time"] = np.array([j.detected_time for j in jumps], dtype="<f8")
+    blocks["partition"] = np.array(
+        [j.partition if j.partition else (np.nan,) * 3 for j in jumps], dtype="<f8"
+    ).reshape(-1, 3)
+    blocks["metrics"] = np.array(
+        [[_scalar((j.metrics or {}).get(k)) for k in metric_names] for j in jumps],
+        dtype="<f8",
+    ).reshape(len(jumps), len(metric_names))
+
+    layout, offset = {}, 0
+    for name, block in blocks.items():
+        layout[name] = {
+            "offset": offset,
+            "dtype": block.dtype.str,
+            "shape": list(block.shape),
+        }
+        offset = _aligned(offset + block.nbytes)
+
+    header = json.dumps(
+        {
+            "version": SESSION_VERSION,
+            "n_jumps": len(jumps),
+            "signals": list(SIGNALS),
+            "metrics": metric_names,
+            "metrics_version": METRICS_VERSION,
+            "feedback": [getattr(j, "feedback", None) for j in jumps],
+            "feedback_metrics": [
+                list(getattr(j, "feedback_metrics", None) or []) for j in jumps
+            ],
+            "blocks": layout,
+        }
+    ).encode("utf-8")
+
+    # Write beside the target and swap it in, so a failed save leaves the
+    # old file intact
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(SESSION_MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        data_start = _aligned(f.tell())
+        for name, block in blocks.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(block).tobytes())
+    os.replace(tmp_filename, filename)
+
+
+def _scalar(value):
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan  # missing, or a non-scalar placeholder such as [0, 0]
+
+
+# -------------------- READ --------------------
+def read_header(filename):
+    """Return ``(header dict, data section offset)`` of a session file."""
+    with open(filename, "rb") as f:
+        magic = f.read(len(SESSION_MAGIC))
+        if magic != SESSION_MAGIC:
+            raise ValueError(f"{filename} is not a JumpCoach session file")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length).decode("utf-8"))
+        data_start = _aligned(f.tell())
+    if header["version"] > SESSION_VERSION:
+        raise ValueError(
+            f"{filename} uses session format v{header['version']}, "
+            f"this build reads up to v{SESSION_VERSION}"
+        )
+    return header, data_start
+
+
+def read_block(filename, header, data_start, name, mmap=False):
+    """Read one named block, optionally as a read-only memory map."""
+    spec = header["blocks"][name]
+    dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+    offset = data_start + spec["offset"]
+    if mmap and int(np.prod(shape)) > 0:
+        return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+    count = int(np.prod(shape))
+    return np.fromfile(filename, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+
+def load_session(filename, workers=None, progress=None):
+    """Rebuild every Jump of a session file from its raw windows.
+
+    ``workers`` / ``progress`` are passed to ``rebuild_jumps``."""
+    header, data_start = read_header(filename)
+    blocks = {
+        name: read_block(filename, header, data_start, name)
+        for name in header["blocks"]
+    }
+
+    records = []
+    for i in range(header["n_jumps"]):
+        record = {}
+        for signal in header["signals"]:
+            lo, hi = blocks[f"{signal}_offsets"][i : i + 2]
+            record[signal] = blocks[signal][lo:hi]
+        partition = blocks["partition"][i]
+        record["detected_time"] = float(blocks["detected_time"][i])
+        record["partition"] = None if np.isnan(partition).any() else tuple(partition)
+        records.append(record)
+
+    jumps = rebuild_jumps(records, workers, progress)
+    for i, j in enumerate(jumps):
+        j.feedback = header["feedback"][i]
+        j.feedback_metrics = header["feedback_metrics"][i]
+    return jumps
+
+
+# -------------------- LAZY (MEMORY-MAPPED) READ --------------------
+class SessionReader:
+    """Memory-mapped session file.
+
+    Only the per-jump index (detected time, partition, metrics) is read up
+    front; the raw signal blocks stay on disk until a jump is materialized."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.header, data_start = read_header(filename)
+        self.signals = self.header["signals"]
+        self.metric_names = self.header["metrics"]
+        # False: the stored metrics predate the current metric registry
+        self.metrics_current = self.header.get("metrics_version") == METRICS_VERSION
+
+        def block(name, mmap=False):
+            return read_block(filename, self.header, data_start, name, mmap=mmap)
+
+        self._signals = {name: block(name, mmap=True) for name in self.signals}
+        self._offsets = {name: block(f"{name}_offsets") for name in self.signals}
+        self.detected_time = block("detected_time")
+        self.partition = block("partition")
+        self.metrics = block("metrics")
+
+    def __len__(self):
+        return self.header["n_jumps"]
+
+    def release(self):
+        """Copy the raw signal blocks into memory and drop the file mapping."""
+        self._signals = {name: np.array(block) for name, block in self._signals.items()}
+
+    def raw_windows(self, index):
+        """Zero-copy (memory-mapped) raw windows of jump ``index``."""
+        windows = {}
+        for name in self.signals:
+            lo, hi = self._offsets[name][index : index + 2]
+            windows[name] = self._signals[name][lo:hi]
+        return windows
+
+    def jumps(self):
+        """One LazyJump per stored jump, in session order."""
+        return [LazyJump(self, i) for i in range(len(self))]
+
+
+class LazyJump:
+    """Stand-in for a Jump of a SessionReader.
+
+    Index data (metrics, partition, feedback, PB flags) is available at once;
+    any other attribute (signal arrays, helpers) builds the real Jump from the
+    memory-mapped raw windows on first use and delegates to it."""
+
+    def __init__(self, reader, index):
+        self._reader = reader
+        self._index = index
+        self._jump = None
+
+        self.detected_time = float(reader.detected_time[index])
+        partition = reader.partition[index]
+        self.partition = None if np.isnan(partition).any() else tuple(partition)
+        self.metrics = {
+            name: float(value)
+            for name, value in zip(reader.metric_names, reader.metrics[index])
+            if not np.isnan(value)
+        } or None
+        self.feedback = reader.header["feedback"][index]
+        self.feedback_metrics = reader.header["feedback_metrics"][index]
+        self.pb_index = None
+        self.second_pb_index = None
+        self.stored_comparison_metrics = {
+            "comparison_metrics": None,
+            "comparison_label": "N/A",
+        }
+
+    def raw_windows(self):
+        return self._reader.raw_windows(self._index)
+
+    def materialize(self):
+        """Build (once) and return the full Jump behind this entry."""
+        if self._jump is None:
+            raw = {k: np.array(v) for k, v in self.raw_windows().items()}
+            self._jump = Jump(
+                **raw,
+                detected_time=self.detected_time,
+                partition=self.partition,
+                imported=True,
+            )
+        return self._jump
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __repr__(self):
+        state = "loaded" if self._jump is not None else "on disk"
+        return f"Jump at {self.detected_time:.2f}s | {state}"
+
+
+def open_session(filename, workers=None, progress=None):
+    """Open a session lazily: returns LazyJumps backed by a memory map.
+
+    Sessions saved with another ``METRICS_VERSION`` (or none) are rebuilt
+    with ``load_session`` instead, so no stale metric is ever shown."""
+    reader = SessionReader(filename)
+    if reader.metrics_current:
+        return reader.jumps()
+    print(f"⚠️  {filename} stores metrics of another version, recomputing them")
+    return load_session(filename, workers, progress)
+
+
+# -------------------- LEGACY PICKLES --------------------
+def load_pickle(filename, recalc=True, workers=None, progress=None):
+    """Load a pickled list of Jumps (pre-.jcs ``save_jumps`` output).
+
+    With ``recalc`` every Jump is rebuilt from its raw windows (keeping the
+    feedback shown for it)."""
+    with open(filename, "rb") as f:
+        loaded = pickle.load(f)
+
+    if not recalc:
+        return loaded
+
+    records = [  # j is the pickled Jump
+        dict(j.raw_windows(), detected_time=j.detected_time, partition=j.partition)
+        for j in loaded
+    ]
+    jumps = rebuild_jumps(records, workers=workers, progress=progress)
+    for old, j in zip(loaded, jumps):
+        j.feedback = getattr(old, "feedback", None)
+        j.feedback_metrics = getattr(old, "feedback_metrics", None) or []
+    return jumps
+
+
+# -------------------- CONVERT --------------------
+def convert_pickle(pkl_filename, out_filename=None, workers=None):
+    """Convert a pickled list of Jumps (old ``save_jumps`` output) to ``.jcs``.
+
+    The jumps are rebuilt first: pickled metric dicts are stale and use an
+    older set of keys."""
+    if out_filename is None:
+        out_filename = os.path.splitext(pkl_filename)[0] + SESSION_EXTENSION
+    jumps = load_pickle(pkl_filename, recalc=True, workers=workers)
+    save_session(jumps, out_filename)
+    print(f"Converted {len(jumps)} jumps: {pkl_filename} -> {out_filename}")
+    return out_filename
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python session_io.py jumps.pkl [session.jcs]")
+    convert_pickle(*sys.argv[1:])